@@ -1,17 +1,29 @@
 from fastapi import FastAPI, Request, Depends, HTTPException, status
 from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
-from fastapi.responses import RedirectResponse, FileResponse
+from fastapi.responses import RedirectResponse, FileResponse, ORJSONResponse
 from starlette.middleware.sessions import SessionMiddleware
 import os
+import stat
+from contextlib import asynccontextmanager
 
 from config import settings
 from admin.routes import applications, nominations, content, settings_routes, auth, logs, broadcasts, participants, backups
 from admin.utils.auth import get_current_user
+from admin.utils.paths import STATIC_DIR, UPLOADS_DIR
+from admin.utils.templates import preload_templates
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Compile templates once at startup."""
+    preload_templates()
+    yield
+
 
 # Create FastAPI app
 app = FastAPI(
     title="Конкурс - Админ-панель",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
     docs_url="/api/docs" if settings.debug else None,
     redoc_url="/api/redoc" if settings.debug else None
 )
@@ -20,14 +32,12 @@ app = FastAPI(
 app.add_middleware(SessionMiddleware, secret_key=settings.admin_secret_key)
 
 # Mount static files (CSS, JS - public)
-static_path = os.path.join(os.path.dirname(__file__), "static")
-if os.path.exists(static_path):
-    app.mount("/static", StaticFiles(directory=static_path), name="static")
+if STATIC_DIR.exists():
+    app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
 
 # Uploads path (NOT mounted as static - protected by auth)
-uploads_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "uploads")
-if not os.path.exists(uploads_path):
-    os.makedirs(uploads_path)
+UPLOADS_DIR.mkdir(exist_ok=True)
+real_uploads_path = os.path.realpath(UPLOADS_DIR)
 
 
 @app.get("/uploads/{file_path:path}")
@@ -45,20 +55,25 @@ async def serve_upload(file_path: str, request: Request):
     # Remove any .. or absolute path attempts
     safe_path = file_path.replace('..', '').lstrip('/')
     
-    # Build full path
-    full_path = os.path.join(uploads_path, safe_path)
-    
-    # Verify the path is within uploads directory
-    real_path = os.path.realpath(full_path)
-    real_uploads = os.path.realpath(uploads_path)
-    if not real_path.startswith(real_uploads):
+    # Build full path and verify it is within uploads directory
+    real_path = os.path.realpath(os.path.join(real_uploads_path, safe_path))
+    try:
+        is_inside = os.path.commonpath([real_path, real_uploads_path]) == real_uploads_path
+    except ValueError:
+        # Different drives on Windows
+        is_inside = False
+    if not is_inside:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    # Check file exists
-    if not os.path.isfile(full_path):
+    # Check file exists (single stat, reused by FileResponse)
+    try:
+        stat_result = os.stat(real_path)
+    except OSError:
+        raise HTTPException(status_code=404, detail="File not found")
+    if not stat.S_ISREG(stat_result.st_mode):
         raise HTTPException(status_code=404, detail="File not found")
     
-    return FileResponse(full_path)
+    return FileResponse(real_path, stat_result=stat_result)
 
 
 # Include routers
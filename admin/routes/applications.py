@@ -1,30 +1,18 @@
 from fastapi import APIRouter, Request, Depends, Form, Query
 from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
-from fastapi.templating import Jinja2Templates
 from typing import Optional
 from datetime import datetime
-import os
+import asyncio
 
-from database.database import async_session
+from database.database import async_session, run_in_session
 from database import crud
 from admin.utils.auth import require_auth
-from admin.utils.jinja_filters import setup_jinja_filters
+from admin.utils.templates import templates
 from admin.utils.csrf import validate_csrf_token
-from admin.utils.export import export_applications_to_xlsx
+from admin.utils.export import export_applications_to_xlsx, iter_file_chunks
+from admin.utils.dates import parse_date
 
 router = APIRouter()
-templates = Jinja2Templates(directory=os.path.join(os.path.dirname(os.path.dirname(__file__)), "templates"))
-setup_jinja_filters(templates)
-
-
-def parse_date(date_str: Optional[str]) -> Optional[datetime]:
-    """Parse date string to datetime."""
-    if not date_str:
-        return None
-    try:
-        return datetime.strptime(date_str, "%Y-%m-%d")
-    except ValueError:
-        return None
 
 
 @router.get("", response_class=HTMLResponse)
@@ -36,7 +24,8 @@ async def list_applications(
     city: Optional[str] = Query(None),
     date_from: Optional[str] = Query(None),
     date_to: Optional[str] = Query(None),
-    page: int = Query(1, ge=1)
+    page: int = Query(1, ge=1),
+    after_id: Optional[int] = Query(None)
 ):
     """List all applications with filters."""
     per_page = 20
@@ -56,33 +45,28 @@ async def list_applications(
     search_q = search.strip() if search else None
     city_q = city.strip() if city else None
     
-    async with async_session() as db:
-        applications = await crud.get_all_applications(
-            db, 
-            skip=skip, 
-            limit=per_page,
-            nomination_id=nom_id,
-            search=search_q,
-            city=city_q,
-            date_from=date_from_dt,
-            date_to=date_to_dt
-        )
-        
-        nominations = await crud.get_all_nominations(db)
-        total = await crud.get_applications_count(
-            db,
-            nomination_id=nom_id,
-            search=search_q,
-            city=city_q,
-            date_from=date_from_dt,
-            date_to=date_to_dt
-        )
-        
+    filters = dict(
+        nomination_id=nom_id,
+        search=search_q,
+        city=city_q,
+        date_from=date_from_dt,
+        date_to=date_to_dt
+    )
+    
+    # Independent queries run concurrently, each in its own session
+    applications, nominations, total, cities = await asyncio.gather(
+        run_in_session(crud.get_all_applications, skip=skip, limit=per_page, after_id=after_id, **filters),
+        run_in_session(crud.get_all_nominations),
+        run_in_session(crud.get_applications_count, **filters),
         # Get unique cities for filter dropdown (optimized query)
-        cities = await crud.get_unique_cities(db)
+        run_in_session(crud.get_unique_cities)
+    )
     
     total_pages = (total + per_page - 1) // per_page
     
+    # Cursor for the "next page" link (keyset pagination)
+    next_after_id = applications[-1].id if applications and page < total_pages else None
+    
     return templates.TemplateResponse("applications/list.html", {
         "request": request,
         "user": user,
@@ -96,6 +80,7 @@ async def list_applications(
         "cities": cities,
         "page": page,
         "total_pages": total_pages,
+        "next_after_id": next_after_id,
         "total": total
     })
 
@@ -123,12 +108,12 @@ async def view_application(
 async def delete_application(
     request: Request,
     application_id: int,
+    csrf_token: str = Form(""),
     user: str = Depends(require_auth)
 ):
     """Delete an application."""
     # Verify CSRF token
-    form = await request.form()
-    if not validate_csrf_token(request, form.get("csrf_token", "")):
+    if not validate_csrf_token(request, csrf_token):
         return RedirectResponse(url="/applications", status_code=302)
     
     async with async_session() as db:
@@ -172,15 +157,15 @@ async def export_applications_xlsx(
             date_to=date_to_dt
         )
     
-    # Generate Excel file
-    excel_buffer = export_applications_to_xlsx(applications)
+    # Generate Excel file in a worker thread to keep the event loop free
+    excel_file = await asyncio.to_thread(export_applications_to_xlsx, applications)
     
     # Generate filename with date
     date_str = datetime.now().strftime("%Y%m%d_%H%M%S")
     filename = f"applications_{date_str}.xlsx"
     
     return StreamingResponse(
-        excel_buffer,
+        iter_file_chunks(excel_file),
         media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
         headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
@@ -1,7 +1,5 @@
 from fastapi import APIRouter, Request, Form, Depends
 from fastapi.responses import RedirectResponse, HTMLResponse
-from fastapi.templating import Jinja2Templates
-import os
 
 from config import settings
 from admin.utils.auth import (
@@ -12,11 +10,9 @@ from admin.utils.auth import (
     record_successful_login
 )
 from admin.utils.csrf import validate_csrf_token
-from admin.utils.jinja_filters import setup_jinja_filters
+from admin.utils.templates import templates
 
 router = APIRouter()
-templates = Jinja2Templates(directory=os.path.join(os.path.dirname(os.path.dirname(__file__)), "templates"))
-setup_jinja_filters(templates)
 
 
 @router.get("/login", response_class=HTMLResponse)
@@ -56,7 +52,7 @@ async def login(request: Request, username: str = Form(...), password: str = For
             }
         )
     
-    if verify_login(username, password):
+    if await verify_login(username, password):
         record_successful_login(request)
         request.session["user"] = username
         return RedirectResponse(url="/applications", status_code=302)
@@ -1,16 +1,27 @@
-from fastapi import APIRouter, Request, Depends, Query
+from fastapi import APIRouter, Request, Depends, Form, Query
 from fastapi.responses import HTMLResponse, RedirectResponse, FileResponse
-from fastapi.templating import Jinja2Templates
-import os
+from pathlib import Path
+from typing import Optional
+import asyncio
 
 from admin.utils.auth import require_auth
 from admin.utils.csrf import validate_csrf_token
-from admin.utils.jinja_filters import setup_jinja_filters
+from admin.utils.templates import templates
 from database.backup import backup_manager, create_manual_backup
 
 router = APIRouter()
-templates = Jinja2Templates(directory=os.path.join(os.path.dirname(os.path.dirname(__file__)), "templates"))
-setup_jinja_filters(templates)
+
+
+def resolve_backup_path(filename: str) -> Optional[Path]:
+    """
+    Resolve backup filename inside the backup directory.
+    Returns None if the path escapes the directory or the file does not exist.
+    """
+    base = Path(backup_manager.backup_dir).resolve()
+    target = (base / filename).resolve()
+    if not target.is_relative_to(base) or not target.is_file():
+        return None
+    return target
 
 
 @router.get("", response_class=HTMLResponse)
@@ -33,15 +44,16 @@ async def list_backups(
 @router.post("/create")
 async def create_backup(
     request: Request,
+    csrf_token: str = Form(""),
     user: str = Depends(require_auth)
 ):
     """Create a new backup."""
     # Verify CSRF token
-    form = await request.form()
-    if not validate_csrf_token(request, form.get("csrf_token", "")):
+    if not validate_csrf_token(request, csrf_token):
         return RedirectResponse(url="/backups", status_code=302)
     
-    backup_path = create_manual_backup()
+    # Copying the database file is blocking I/O
+    backup_path = await asyncio.to_thread(create_manual_backup)
     
     if backup_path:
         message = "Бэкап успешно создан!"
@@ -58,13 +70,9 @@ async def download_backup(
     user: str = Depends(require_auth)
 ):
     """Download a backup file."""
-    # Security: ensure filename is safe
-    if ".." in filename or "/" in filename or "\\" in filename:
-        return RedirectResponse(url="/backups", status_code=302)
-    
-    backup_path = os.path.join(backup_manager.backup_dir, filename)
-    
-    if not os.path.exists(backup_path):
+    # Security: ensure file is inside the backup directory
+    backup_path = resolve_backup_path(filename)
+    if backup_path is None:
         return RedirectResponse(url="/backups?message=Файл не найден", status_code=302)
     
     return FileResponse(
@@ -78,21 +86,18 @@ async def download_backup(
 async def delete_backup(
     request: Request,
     filename: str,
+    csrf_token: str = Form(""),
     user: str = Depends(require_auth)
 ):
     """Delete a backup file."""
     # Verify CSRF token
-    form = await request.form()
-    if not validate_csrf_token(request, form.get("csrf_token", "")):
-        return RedirectResponse(url="/backups", status_code=302)
-    
-    # Security: ensure filename is safe
-    if ".." in filename or "/" in filename or "\\" in filename:
+    if not validate_csrf_token(request, csrf_token):
         return RedirectResponse(url="/backups", status_code=302)
     
-    backup_path = os.path.join(backup_manager.backup_dir, filename)
+    # Security: ensure file is inside the backup directory
+    backup_path = resolve_backup_path(filename)
     
-    if backup_manager.delete_backup(backup_path):
+    if backup_path and backup_manager.delete_backup(str(backup_path)):
         message = "Бэкап удалён"
     else:
         message = "Ошибка при удалении бэкапа"
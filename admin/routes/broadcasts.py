@@ -1,6 +1,5 @@
-from fastapi import APIRouter, Request, Depends, Form, UploadFile, File, BackgroundTasks
+from fastapi import APIRouter, Request, Depends, Form, UploadFile, File
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
 from typing import Optional
 from datetime import datetime
 import os
@@ -14,21 +13,62 @@ from database import crud
 from database.models import BroadcastStatus
 from admin.utils.auth import require_auth
 from admin.utils.csrf import validate_csrf_token
-from admin.utils.jinja_filters import setup_jinja_filters
+from admin.utils.templates import templates
+from admin.utils.paths import UPLOADS_DIR
 
 # Max broadcast image size (5 MB)
 MAX_BROADCAST_IMAGE_SIZE = 5 * 1024 * 1024
+# Allowed broadcast image extensions
+ALLOWED_IMAGE_EXTENSIONS = frozenset({'.jpg', '.jpeg', '.png', '.gif'})
+# Read uploaded images in 64 KB chunks
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# Broadcast sending: parallel requests and global rate (Telegram allows ~30 msg/s)
+BROADCAST_CONCURRENCY = 25
+BROADCAST_RATE_PER_SECOND = 25
+# Save sending progress to DB every N users
+BROADCAST_PROGRESS_BATCH = 500
 
 router = APIRouter()
-templates = Jinja2Templates(directory=os.path.join(os.path.dirname(os.path.dirname(__file__)), "templates"))
 logger = logging.getLogger(__name__)
-setup_jinja_filters(templates)
+
+# Running broadcast tasks (strong references so they are not garbage-collected)
+_broadcast_tasks: set[asyncio.Task] = set()
 
 # Directory for broadcast images
-UPLOAD_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "uploads", "broadcasts")
+UPLOAD_DIR = str(UPLOADS_DIR / "broadcasts")
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 
+async def save_broadcast_image(image: UploadFile, ext: str) -> Optional[str]:
+    """
+    Stream uploaded image to disk chunk by chunk.
+    Returns saved file path, or None if image exceeds MAX_BROADCAST_IMAGE_SIZE.
+    """
+    filename = f"{uuid.uuid4()}{ext}"
+    filepath = os.path.join(UPLOAD_DIR, filename)
+    
+    size = 0
+    try:
+        async with aiofiles.open(filepath, 'wb') as f:
+            while chunk := await image.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > MAX_BROADCAST_IMAGE_SIZE:
+                    break
+                await f.write(chunk)
+    except BaseException:
+        # Don't leave a partial file behind on read/write errors or cancellation
+        if os.path.exists(filepath):
+            os.remove(filepath)
+        raise
+    
+    if size > MAX_BROADCAST_IMAGE_SIZE:
+        os.remove(filepath)
+        return None
+    
+    return filepath
+
+
 @router.get("", response_class=HTMLResponse)
 async def list_broadcasts(request: Request, user: str = Depends(require_auth)):
     """List all broadcast messages."""
@@ -70,25 +110,15 @@ async def create_broadcast(
     # Save image if uploaded
     if image and image.filename:
         ext = os.path.splitext(image.filename)[1].lower()
-        if ext in ['.jpg', '.jpeg', '.png', '.gif']:
-            content = await image.read()
+        if ext in ALLOWED_IMAGE_EXTENSIONS:
+            image_path = await save_broadcast_image(image, ext)
             # Check file size
-            if len(content) > MAX_BROADCAST_IMAGE_SIZE:
-                async with async_session() as db:
-                    nominations = await crud.get_all_nominations(db)
+            if image_path is None:
                 return templates.TemplateResponse("broadcasts/form.html", {
                     "request": request,
                     "user": user,
                     "error": "Файл слишком большой (макс. 5 МБ)"
                 })
-            
-            filename = f"{uuid.uuid4()}{ext}"
-            filepath = os.path.join(UPLOAD_DIR, filename)
-            
-            async with aiofiles.open(filepath, 'wb') as f:
-                await f.write(content)
-            
-            image_path = filepath
     
     async with async_session() as db:
         broadcast = await crud.create_broadcast(db, text=text, image_path=image_path)
@@ -134,10 +164,10 @@ async def update_broadcast(
     # Save new image if uploaded
     if image and image.filename:
         ext = os.path.splitext(image.filename)[1].lower()
-        if ext in ['.jpg', '.jpeg', '.png', '.gif']:
-            content = await image.read()
+        if ext in ALLOWED_IMAGE_EXTENSIONS:
+            filepath = await save_broadcast_image(image, ext)
             # Check file size
-            if len(content) > MAX_BROADCAST_IMAGE_SIZE:
+            if filepath is None:
                 async with async_session() as db:
                     broadcast = await crud.get_broadcast_by_id(db, broadcast_id)
                 return templates.TemplateResponse("broadcasts/form.html", {
@@ -147,12 +177,6 @@ async def update_broadcast(
                     "error": "Файл слишком большой (макс. 5 МБ)"
                 })
             
-            filename = f"{uuid.uuid4()}{ext}"
-            filepath = os.path.join(UPLOAD_DIR, filename)
-            
-            async with aiofiles.open(filepath, 'wb') as f:
-                await f.write(content)
-            
             update_data["image_path"] = filepath
     
     async with async_session() as db:
@@ -165,12 +189,12 @@ async def update_broadcast(
 async def delete_broadcast(
     request: Request,
     broadcast_id: int,
+    csrf_token: str = Form(""),
     user: str = Depends(require_auth)
 ):
     """Delete broadcast message."""
     # Verify CSRF token
-    form = await request.form()
-    if not validate_csrf_token(request, form.get("csrf_token", "")):
+    if not validate_csrf_token(request, csrf_token):
         return RedirectResponse(url="/broadcasts", status_code=302)
     
     async with async_session() as db:
@@ -187,6 +211,7 @@ async def delete_broadcast(
 
 async def send_broadcast_task(broadcast_id: int):
     """Background task to send broadcast to all users."""
+    from aiogram.types import FSInputFile
     from bot.main import bot
     
     # Get broadcast info and user list with short-lived session
@@ -199,11 +224,10 @@ async def send_broadcast_task(broadcast_id: int):
         broadcast_text = broadcast.text
         broadcast_image_path = broadcast.image_path
         
-        # Get all users
-        user_ids = await crud.get_all_user_telegram_ids(db)
-        total = len(user_ids)
+        # Recipients are fetched batch by batch below, only count them here
+        total = await crud.get_broadcast_recipients_count(db)
         
-        await crud.update_broadcast(
+        await crud.update_broadcast_progress(
             db, broadcast_id,
             status=BroadcastStatus.SENDING,
             total_count=total
@@ -212,46 +236,95 @@ async def send_broadcast_task(broadcast_id: int):
     sent = 0
     failed = 0
     
-    # Send messages in batches, updating status periodically
-    batch_size = 50
-    for i, user_id in enumerate(user_ids):
-        try:
-            if broadcast_image_path and os.path.exists(broadcast_image_path):
-                from aiogram.types import FSInputFile
-                photo = FSInputFile(broadcast_image_path)
-                await bot.send_photo(
-                    chat_id=user_id,
-                    photo=photo,
-                    caption=broadcast_text,
-                    parse_mode="HTML"
-                )
+    # Prepare image once for all recipients. After the first successful
+    # upload it is replaced by Telegram file_id, so the file is read only once.
+    photo = None
+    if broadcast_image_path and os.path.isfile(broadcast_image_path):
+        photo = FSInputFile(broadcast_image_path)
+    photo_upload_lock = asyncio.Lock()
+    
+    semaphore = asyncio.Semaphore(BROADCAST_CONCURRENCY)
+    loop = asyncio.get_running_loop()
+    send_interval = 1 / BROADCAST_RATE_PER_SECOND
+    next_slot = loop.time()
+    
+    async def send_photo(user_id: int):
+        nonlocal photo
+        if isinstance(photo, FSInputFile):
+            # Upload the file once; other senders wait for its file_id
+            async with photo_upload_lock:
+                if isinstance(photo, FSInputFile):
+                    message = await bot.send_photo(
+                        chat_id=user_id,
+                        photo=photo,
+                        caption=broadcast_text,
+                        parse_mode="HTML"
+                    )
+                    photo = message.photo[-1].file_id
+                    return
+        
+        await bot.send_photo(
+            chat_id=user_id,
+            photo=photo,
+            caption=broadcast_text,
+            parse_mode="HTML"
+        )
+    
+    async def send_to_user(user_id: int):
+        nonlocal next_slot
+        # Reserve the next free send slot to stay within flood limits
+        now = loop.time()
+        slot = max(next_slot, now)
+        next_slot = slot + send_interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+        
+        async with semaphore:
+            if photo is not None:
+                await send_photo(user_id)
             else:
                 await bot.send_message(
                     chat_id=user_id,
                     text=broadcast_text,
                     parse_mode="HTML"
                 )
-            sent += 1
-            logger.info(f"Broadcast {broadcast_id}: sent to {user_id}")
-        except Exception as e:
-            failed += 1
-            logger.warning(f"Broadcast {broadcast_id}: failed to send to {user_id}: {e}")
+    
+    # Send messages in batches, updating status periodically.
+    # Each page of recipients is read in its own short session, so no
+    # connection is held while messages are being sent.
+    last_id = 0
+    while True:
+        async with async_session() as db:
+            rows = await crud.get_user_telegram_ids_after(db, last_id, BROADCAST_PROGRESS_BATCH)
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        batch = [telegram_id for _, telegram_id in rows]
         
-        # Small delay to avoid flood limits
-        await asyncio.sleep(0.05)
+        results = await asyncio.gather(
+            *(send_to_user(user_id) for user_id in batch),
+            return_exceptions=True
+        )
         
-        # Update progress every batch
-        if (i + 1) % batch_size == 0:
-            async with async_session() as db:
-                await crud.update_broadcast(
-                    db, broadcast_id,
-                    sent_count=sent,
-                    failed_count=failed
-                )
+        for user_id, result in zip(batch, results):
+            if isinstance(result, Exception):
+                failed += 1
+                logger.warning(f"Broadcast {broadcast_id}: failed to send to {user_id}: {result}")
+            else:
+                sent += 1
+                logger.info(f"Broadcast {broadcast_id}: sent to {user_id}")
+        
+        # Update progress after every batch
+        async with async_session() as db:
+            await crud.update_broadcast_progress(
+                db, broadcast_id,
+                sent_count=sent,
+                failed_count=failed
+            )
     
-    # Update final status with new session
+    # Update final status and counters in one statement
     async with async_session() as db:
-        await crud.update_broadcast(
+        await crud.update_broadcast_progress(
             db, broadcast_id,
             status=BroadcastStatus.SENT,
             sent_count=sent,
@@ -262,17 +335,23 @@ async def send_broadcast_task(broadcast_id: int):
     logger.info(f"Broadcast {broadcast_id} completed: {sent} sent, {failed} failed")
 
 
+def _on_broadcast_task_done(task: asyncio.Task):
+    """Forget finished broadcast task and log its failure if any."""
+    _broadcast_tasks.discard(task)
+    if not task.cancelled() and task.exception():
+        logger.error(f"Broadcast task failed: {task.exception()}")
+
+
 @router.post("/{broadcast_id}/send")
 async def send_broadcast(
     request: Request,
     broadcast_id: int,
-    background_tasks: BackgroundTasks,
+    csrf_token: str = Form(""),
     user: str = Depends(require_auth)
 ):
     """Start sending broadcast to all users."""
     # Verify CSRF token
-    form = await request.form()
-    if not validate_csrf_token(request, form.get("csrf_token", "")):
+    if not validate_csrf_token(request, csrf_token):
         return RedirectResponse(url="/broadcasts", status_code=302)
     
     async with async_session() as db:
@@ -280,7 +359,9 @@ async def send_broadcast(
         if not broadcast or broadcast.status == BroadcastStatus.SENDING:
             return RedirectResponse(url="/broadcasts", status_code=302)
     
-    # Start background task
-    background_tasks.add_task(send_broadcast_task, broadcast_id)
+    # Start sending independently of this request
+    task = asyncio.create_task(send_broadcast_task(broadcast_id))
+    _broadcast_tasks.add(task)
+    task.add_done_callback(_on_broadcast_task_done)
     
     return RedirectResponse(url="/broadcasts", status_code=302)
@@ -1,36 +1,59 @@
 from fastapi import APIRouter, Request, Depends, Query
 from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
 from typing import Optional
 from datetime import datetime
 import os
 
 from admin.utils.auth import require_auth
-from admin.utils.jinja_filters import setup_jinja_filters
+from admin.utils.templates import templates
+from admin.utils.paths import LOGS_DIR
 
 router = APIRouter()
-templates = Jinja2Templates(directory=os.path.join(os.path.dirname(os.path.dirname(__file__)), "templates"))
-setup_jinja_filters(templates)
 
 # Path to log file
-LOG_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "logs", "bot.log")
+LOG_FILE = str(LOGS_DIR / "bot.log")
+# Read log file tail in 64 KB blocks
+LOG_READ_BLOCK_SIZE = 64 * 1024
 
 
 def read_log_lines(file_path: str, lines: int = 200, filter_level: Optional[str] = None) -> list:
-    """Read last N lines from log file with optional level filter."""
-    if not os.path.exists(file_path):
-        return []
+    """
+    Read last N lines from log file with optional level filter, newest first.
+    The file is read backwards in blocks, so only its tail is loaded.
+    """
+    level_bytes = filter_level.upper().encode() if filter_level else None
+    
+    def matches(line: bytes) -> bool:
+        return bool(line) and (level_bytes is None or level_bytes in line)
     
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            all_lines = f.readlines()
-        
-        # Filter by level if specified
-        if filter_level:
-            all_lines = [line for line in all_lines if filter_level.upper() in line]
+        # Matching lines, newest first
+        found = []
+        with open(file_path, 'rb') as f:
+            position = f.seek(0, os.SEEK_END)
+            remainder = b''
+            
+            while position > 0 and len(found) < lines:
+                read_size = min(LOG_READ_BLOCK_SIZE, position)
+                position -= read_size
+                f.seek(position)
+                block_lines = (f.read(read_size) + remainder).split(b'\n')
+                
+                # First piece may be cut in the middle, finish it with the next block
+                remainder = block_lines.pop(0)
+                for line in reversed(block_lines):
+                    if matches(line):
+                        found.append(line)
+                        if len(found) == lines:
+                            break
+            
+            # Very first line of the file
+            if position == 0 and len(found) < lines and matches(remainder):
+                found.append(remainder)
         
-        # Get last N lines
-        return all_lines[-lines:]
+        return [line.decode('utf-8', errors='replace') for line in found]
+    except FileNotFoundError:
+        return []
     except Exception as e:
         return [f"Ошибка чтения логов: {str(e)}"]
 
@@ -38,18 +61,17 @@ def read_log_lines(file_path: str, lines: int = 200, filter_level: Optional[str]
 def parse_log_line(line: str) -> dict:
     """Parse log line into structured data."""
     # Expected format: 2026-01-29 12:34:56,789 - module - LEVEL - message
-    try:
-        parts = line.split(' - ', 3)
-        if len(parts) >= 4:
-            return {
-                'timestamp': parts[0].strip(),
-                'module': parts[1].strip(),
-                'level': parts[2].strip(),
-                'message': parts[3].strip(),
-                'raw': line
-            }
-    except:
-        pass
+    # (split is faster than an anchored regex here; strip also drops \r of CRLF logs)
+    parts = line.split(' - ', 3)
+    if len(parts) == 4:
+        timestamp, module, level, message = parts
+        return {
+            'timestamp': timestamp.strip(),
+            'module': module.strip(),
+            'level': level.strip(),
+            'message': message.strip(),
+            'raw': line
+        }
     
     return {
         'timestamp': '',
@@ -70,21 +92,21 @@ async def view_logs(
     """View application logs."""
     log_lines = read_log_lines(LOG_FILE, lines, level)
     
-    # Parse lines
+    # Parse lines (already newest first)
     parsed_logs = [parse_log_line(line) for line in log_lines]
     
-    # Reverse to show newest first
-    parsed_logs.reverse()
-    
-    # Get log file info
+    # Get log file info (single stat call)
     log_info = {
-        'exists': os.path.exists(LOG_FILE),
+        'exists': False,
         'path': LOG_FILE,
         'size': 0
     }
     
-    if log_info['exists']:
-        log_info['size'] = os.path.getsize(LOG_FILE)
+    try:
+        log_info['size'] = os.stat(LOG_FILE).st_size
+        log_info['exists'] = True
+    except OSError:
+        pass
     
     return templates.TemplateResponse("logs/list.html", {
         "request": request,
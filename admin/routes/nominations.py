@@ -1,31 +1,36 @@
 from fastapi import APIRouter, Request, Depends, Form
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
-from datetime import datetime
 from typing import Optional
-import os
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from database.database import async_session
+from database.database import get_db
 from database import crud
 from admin.utils.auth import require_auth
 from admin.utils.csrf import validate_csrf_token
-from admin.utils.jinja_filters import setup_jinja_filters
+from admin.utils.templates import templates
+from admin.utils.dates import parse_date
 
 router = APIRouter()
-templates = Jinja2Templates(directory=os.path.join(os.path.dirname(os.path.dirname(__file__)), "templates"))
-setup_jinja_filters(templates)
 
 
 @router.get("", response_class=HTMLResponse)
-async def list_nominations(request: Request, user: str = Depends(require_auth)):
+async def list_nominations(
+    request: Request,
+    user: str = Depends(require_auth),
+    db: AsyncSession = Depends(get_db)
+):
     """List all nominations."""
-    async with async_session() as db:
-        nominations = await crud.get_all_nominations(db)
+    nominations = await crud.get_all_nominations(db)
+    application_counts = {
+        nomination_id: count
+        for nomination_id, _, count in await crud.get_applications_count_by_nomination(db)
+    }
     
     return templates.TemplateResponse("nominations/list.html", {
         "request": request,
         "user": user,
-        "nominations": nominations
+        "nominations": nominations,
+        "application_counts": application_counts
     })
 
 
@@ -48,36 +53,24 @@ async def create_nomination(
     deadline: Optional[str] = Form(None),
     is_active: bool = Form(True),
     csrf_token: str = Form(""),
-    user: str = Depends(require_auth)
+    user: str = Depends(require_auth),
+    db: AsyncSession = Depends(get_db)
 ):
     """Create new stage."""
     # Verify CSRF token
     if not validate_csrf_token(request, csrf_token):
         return RedirectResponse(url="/nominations", status_code=302)
     
-    async with async_session() as db:
-        start_date_dt = None
-        deadline_dt = None
-        
-        if start_date:
-            try:
-                start_date_dt = datetime.strptime(start_date, "%Y-%m-%d")
-            except ValueError:
-                pass
-                
-        if deadline:
-            try:
-                deadline_dt = datetime.strptime(deadline, "%Y-%m-%d")
-            except ValueError:
-                pass
-        
-        await crud.create_nomination(
-            db,
-            name=name,
-            description=description if description else None,
-            start_date=start_date_dt,
-            deadline=deadline_dt
-        )
+    start_date_dt = parse_date(start_date)
+    deadline_dt = parse_date(deadline)
+    
+    await crud.create_nomination(
+        db,
+        name=name,
+        description=description if description else None,
+        start_date=start_date_dt,
+        deadline=deadline_dt
+    )
     
     return RedirectResponse(url="/nominations", status_code=302)
 
@@ -86,13 +79,13 @@ async def create_nomination(
 async def edit_nomination_form(
     request: Request,
     nomination_id: int,
-    user: str = Depends(require_auth)
+    user: str = Depends(require_auth),
+    db: AsyncSession = Depends(get_db)
 ):
     """Show form to edit nomination."""
-    async with async_session() as db:
-        nomination = await crud.get_nomination_by_id(db, nomination_id)
-        if not nomination:
-            return RedirectResponse(url="/nominations", status_code=302)
+    nomination = await crud.get_nomination_by_id(db, nomination_id)
+    if not nomination:
+        return RedirectResponse(url="/nominations", status_code=302)
     
     return templates.TemplateResponse("nominations/form.html", {
         "request": request,
@@ -111,38 +104,26 @@ async def update_nomination(
     deadline: Optional[str] = Form(None),
     is_active: bool = Form(False),
     csrf_token: str = Form(""),
-    user: str = Depends(require_auth)
+    user: str = Depends(require_auth),
+    db: AsyncSession = Depends(get_db)
 ):
     """Update stage."""
     # Verify CSRF token
     if not validate_csrf_token(request, csrf_token):
         return RedirectResponse(url="/nominations", status_code=302)
     
-    async with async_session() as db:
-        start_date_dt = None
-        deadline_dt = None
-        
-        if start_date:
-            try:
-                start_date_dt = datetime.strptime(start_date, "%Y-%m-%d")
-            except ValueError:
-                pass
-                
-        if deadline:
-            try:
-                deadline_dt = datetime.strptime(deadline, "%Y-%m-%d")
-            except ValueError:
-                pass
-        
-        await crud.update_nomination(
-            db,
-            nomination_id,
-            name=name,
-            description=description if description else None,
-            start_date=start_date_dt,
-            deadline=deadline_dt,
-            is_active=is_active
-        )
+    start_date_dt = parse_date(start_date)
+    deadline_dt = parse_date(deadline)
+    
+    await crud.update_nomination(
+        db,
+        nomination_id,
+        name=name,
+        description=description if description else None,
+        start_date=start_date_dt,
+        deadline=deadline_dt,
+        is_active=is_active
+    )
     
     return RedirectResponse(url="/nominations", status_code=302)
 
@@ -151,15 +132,15 @@ async def update_nomination(
 async def delete_nomination(
     request: Request,
     nomination_id: int,
-    user: str = Depends(require_auth)
+    csrf_token: str = Form(""),
+    user: str = Depends(require_auth),
+    db: AsyncSession = Depends(get_db)
 ):
     """Delete nomination."""
     # Verify CSRF token
-    form = await request.form()
-    if not validate_csrf_token(request, form.get("csrf_token", "")):
+    if not validate_csrf_token(request, csrf_token):
         return RedirectResponse(url="/nominations", status_code=302)
     
-    async with async_session() as db:
-        await crud.delete_nomination(db, nomination_id)
+    await crud.delete_nomination(db, nomination_id)
     
     return RedirectResponse(url="/nominations", status_code=302)
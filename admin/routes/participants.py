@@ -1,19 +1,17 @@
 from fastapi import APIRouter, Request, Depends, Query
 from fastapi.responses import HTMLResponse, StreamingResponse
-from fastapi.templating import Jinja2Templates
 from typing import Optional
 from datetime import datetime
-import os
+import asyncio
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from database.database import async_session
+from database.database import get_db, run_in_session
 from database import crud
 from admin.utils.auth import require_auth
-from admin.utils.jinja_filters import setup_jinja_filters
-from admin.utils.export import export_participants_to_xlsx
+from admin.utils.templates import templates
+from admin.utils.export import export_participants_to_xlsx, iter_file_chunks
 
 router = APIRouter()
-templates = Jinja2Templates(directory=os.path.join(os.path.dirname(os.path.dirname(__file__)), "templates"))
-setup_jinja_filters(templates)
 
 
 @router.get("", response_class=HTMLResponse)
@@ -21,7 +19,8 @@ async def list_participants(
     request: Request,
     user: str = Depends(require_auth),
     page: int = Query(1, ge=1),
-    search: Optional[str] = Query(None)
+    search: Optional[str] = Query(None),
+    after_id: Optional[int] = Query(None)
 ):
     """List all participants with their stats."""
     per_page = 50
@@ -29,21 +28,24 @@ async def list_participants(
     search_q = search.strip() if search else None
     
     try:
-        async with async_session() as db:
-            # Get participants with stats in a single optimized query
-            participants_data = await crud.get_participants_with_stats(
-                db, skip=skip, limit=per_page, search=search_q
-            )
-            total = await crud.get_participants_count(db, search=search_q)
+        # Participants page and total count run concurrently, each in its own session
+        participants_data, total = await asyncio.gather(
+            run_in_session(crud.get_participants_with_stats, skip=skip, limit=per_page, search=search_q, after_id=after_id),
+            run_in_session(crud.get_participants_count, search=search_q)
+        )
         
         total_pages = max((total + per_page - 1) // per_page, 1)
         
+        # Cursor for the "next page" link (keyset pagination)
+        next_after_id = participants_data[-1]['user'].id if participants_data and page < total_pages else None
+        
         return templates.TemplateResponse("participants/list.html", {
             "request": request,
             "user": user,
             "participants": participants_data,
             "page": page,
             "total_pages": total_pages,
+            "next_after_id": next_after_id,
             "total": total,
             "search": search or ""
         })
@@ -57,50 +59,22 @@ async def list_participants(
 @router.get("/export/xlsx")
 async def export_participants_xlsx(
     request: Request,
-    user: str = Depends(require_auth)
+    user: str = Depends(require_auth),
+    db: AsyncSession = Depends(get_db)
 ):
     """Export all participants to Excel file."""
-    async with async_session() as db:
-        # Get all users with applications
-        query = (
-            select(User)
-            .where(User.id.in_(select(Application.user_id).distinct()))
-            .order_by(User.created_at.desc())
-        )
-        result = await db.execute(query)
-        users = result.scalars().all()
-        
-        # Get stats for each user
-        participants_data = []
-        for participant in users:
-            app_count_query = select(func.count(Application.id)).where(
-                Application.user_id == participant.id
-            )
-            app_count = await db.scalar(app_count_query) or 0
-            
-            last_app_query = (
-                select(Application.created_at)
-                .where(Application.user_id == participant.id)
-                .order_by(Application.created_at.desc())
-                .limit(1)
-            )
-            last_app_date = await db.scalar(last_app_query)
-            
-            participants_data.append({
-                'user': participant,
-                'application_count': app_count,
-                'last_application_date': last_app_date
-            })
+    # All participants with stats in a single grouped query
+    participants_data = await crud.get_participants_with_stats(db, limit=None)
     
-    # Generate Excel file
-    excel_buffer = export_participants_to_xlsx(participants_data)
+    # Generate Excel file in a worker thread to keep the event loop free
+    excel_file = await asyncio.to_thread(export_participants_to_xlsx, participants_data)
     
     # Generate filename with date
     date_str = datetime.now().strftime("%Y%m%d_%H%M%S")
     filename = f"participants_{date_str}.xlsx"
     
     return StreamingResponse(
-        excel_buffer,
+        iter_file_chunks(excel_file),
         media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
         headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
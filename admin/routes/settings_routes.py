@@ -1,31 +1,32 @@
 from fastapi import APIRouter, Request, Depends, Form
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
-import os
+from types import MappingProxyType
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from database.database import async_session
+from database.database import get_db
 from database import crud
 from admin.utils.auth import require_auth
 from admin.utils.csrf import validate_csrf_token
-from admin.utils.jinja_filters import setup_jinja_filters
+from admin.utils.templates import templates
 
 router = APIRouter()
-templates = Jinja2Templates(directory=os.path.join(os.path.dirname(os.path.dirname(__file__)), "templates"))
-setup_jinja_filters(templates)
 
-# Default settings
-DEFAULT_SETTINGS = {
+# Default settings (read-only)
+DEFAULT_SETTINGS = MappingProxyType({
     "accepting_applications": ("Приём заявок", "bool", "true"),
     "max_applications_per_user": ("Макс. заявок от пользователя", "int", "10"),
-}
+})
 
 
 @router.get("", response_class=HTMLResponse)
-async def list_settings(request: Request, user: str = Depends(require_auth)):
+async def list_settings(
+    request: Request,
+    user: str = Depends(require_auth),
+    db: AsyncSession = Depends(get_db)
+):
     """List all settings."""
-    async with async_session() as db:
-        settings_list = await crud.get_all_settings(db)
-        settings_dict = {s.key: s.value for s in settings_list}
+    settings_list = await crud.get_all_settings(db)
+    settings_dict = {s.key: s.value for s in settings_list}
     
     return templates.TemplateResponse("settings/list.html", {
         "request": request,
@@ -36,7 +37,11 @@ async def list_settings(request: Request, user: str = Depends(require_auth)):
 
 
 @router.post("/update")
-async def update_settings(request: Request, user: str = Depends(require_auth)):
+async def update_settings(
+    request: Request,
+    user: str = Depends(require_auth),
+    db: AsyncSession = Depends(get_db)
+):
     """Update settings."""
     form_data = await request.form()
     
@@ -44,14 +49,17 @@ async def update_settings(request: Request, user: str = Depends(require_auth)):
     if not validate_csrf_token(request, form_data.get("csrf_token", "")):
         return RedirectResponse(url="/settings", status_code=302)
     
-    async with async_session() as db:
-        for key, (title, value_type, default) in DEFAULT_SETTINGS.items():
-            value = form_data.get(key, default)
-            
-            # Handle checkbox for boolean
-            if value_type == "bool":
-                value = "true" if form_data.get(key) else "false"
-            
-            await crud.set_setting(db, key, str(value), value_type, title)
+    items = []
+    for key, (title, value_type, default) in DEFAULT_SETTINGS.items():
+        value = form_data.get(key, default)
+        
+        # Handle checkbox for boolean
+        if value_type == "bool":
+            value = "true" if form_data.get(key) else "false"
+        
+        items.append((key, str(value), value_type, title))
+    
+    # Save all settings in one statement
+    await crud.set_settings_bulk(db, items)
     
     return RedirectResponse(url="/settings", status_code=302)
@@ -1,20 +1,27 @@
 from fastapi import Request, HTTPException
 from fastapi.responses import RedirectResponse
-from collections import defaultdict
 import time
+import asyncio
 import hmac
 import bcrypt
 from config import settings
 
 
 # Rate limiting storage for login attempts
+# Only IPs with failed attempts are stored, entries expire (see _prune_login_attempts)
 # {ip_address: {'attempts': int, 'last_attempt': float, 'blocked_until': float}}
-_login_attempts = defaultdict(lambda: {'attempts': 0, 'last_attempt': 0, 'blocked_until': 0})
+_login_attempts: dict[str, dict] = {}
 
 # Settings
 MAX_LOGIN_ATTEMPTS = 5          # Max attempts before block
 LOGIN_BLOCK_DURATION = 300      # Block for 5 minutes (300 seconds)
 ATTEMPT_RESET_TIME = 600        # Reset attempts after 10 minutes of no activity
+MAX_TRACKED_IPS = 10000         # Upper bound for rate limiting storage
+
+# Admin credentials encoded once for comparison
+_ADMIN_USERNAME = settings.admin_username.encode()
+_ADMIN_PASSWORD_HASH = settings.admin_password_hash.encode('utf-8')
+_ADMIN_PASSWORD = settings.admin_password.encode()
 
 
 def get_client_ip(request: Request) -> str:
@@ -26,23 +33,31 @@ def get_client_ip(request: Request) -> str:
     return request.client.host if request.client else "unknown"
 
 
+def _is_expired(data: dict, now: float) -> bool:
+    """Entry is no longer blocking and its attempts would be reset."""
+    return data['blocked_until'] <= now and now - data['last_attempt'] > ATTEMPT_RESET_TIME
+
+
+def _prune_login_attempts(now: float):
+    """Drop expired entries, then the oldest ones if storage is still full."""
+    for ip in [ip for ip, data in _login_attempts.items() if _is_expired(data, now)]:
+        del _login_attempts[ip]
+    while len(_login_attempts) >= MAX_TRACKED_IPS:
+        del _login_attempts[next(iter(_login_attempts))]
+
+
 def check_login_rate_limit(request: Request) -> tuple[bool, int]:
     """
     Check if login is allowed for this IP.
     Returns (allowed: bool, seconds_remaining: int)
     """
-    ip = get_client_ip(request)
+    data = _login_attempts.get(get_client_ip(request))
     now = time.time()
-    data = _login_attempts[ip]
     
     # Check if blocked
-    if data['blocked_until'] > now:
+    if data and data['blocked_until'] > now:
         return False, int(data['blocked_until'] - now)
     
-    # Reset old attempts
-    if now - data['last_attempt'] > ATTEMPT_RESET_TIME:
-        data['attempts'] = 0
-    
     return True, 0
 
 
@@ -53,7 +68,15 @@ def record_failed_login(request: Request) -> tuple[bool, int]:
     """
     ip = get_client_ip(request)
     now = time.time()
-    data = _login_attempts[ip]
+    data = _login_attempts.get(ip)
+    
+    if data is None:
+        if len(_login_attempts) >= MAX_TRACKED_IPS:
+            _prune_login_attempts(now)
+        data = _login_attempts[ip] = {'attempts': 0, 'last_attempt': 0, 'blocked_until': 0}
+    elif now - data['last_attempt'] > ATTEMPT_RESET_TIME:
+        # Reset old attempts
+        data['attempts'] = 0
     
     data['attempts'] += 1
     data['last_attempt'] = now
@@ -69,29 +92,29 @@ def record_failed_login(request: Request) -> tuple[bool, int]:
 
 def record_successful_login(request: Request):
     """Clear login attempts on successful login."""
-    ip = get_client_ip(request)
-    if ip in _login_attempts:
-        del _login_attempts[ip]
+    _login_attempts.pop(get_client_ip(request), None)
 
 
-def verify_login(username: str, password: str) -> bool:
+async def verify_login(username: str, password: str) -> bool:
     """Verify admin login credentials using secure comparison."""
     # Check username with constant-time comparison
-    if not hmac.compare_digest(username.encode(), settings.admin_username.encode()):
+    if not hmac.compare_digest(username.encode(), _ADMIN_USERNAME):
         return False
     
     # If password hash is set, use bcrypt verification
-    if settings.admin_password_hash:
+    if _ADMIN_PASSWORD_HASH:
         try:
-            return bcrypt.checkpw(
+            # bcrypt is CPU-heavy, keep it off the event loop
+            return await asyncio.to_thread(
+                bcrypt.checkpw,
                 password.encode('utf-8'), 
-                settings.admin_password_hash.encode('utf-8')
+                _ADMIN_PASSWORD_HASH
             )
         except Exception:
             return False
     
     # Fallback to plaintext comparison (deprecated)
-    return hmac.compare_digest(password.encode(), settings.admin_password.encode())
+    return hmac.compare_digest(password.encode(), _ADMIN_PASSWORD)
 
 
 def get_current_user(request: Request) -> str | None:
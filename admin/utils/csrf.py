@@ -27,7 +27,8 @@ def validate_csrf_token(request: Request, token: str) -> bool:
     session_token = request.session.get(CSRF_TOKEN_KEY)
     if not session_token or not token:
         return False
-    return secrets.compare_digest(session_token, token)
+    # Compare bytes: str arguments must be ASCII, otherwise compare_digest raises TypeError
+    return secrets.compare_digest(session_token.encode(), token.encode())
 
 
 async def verify_csrf_token(request: Request, csrf_token: str = None):
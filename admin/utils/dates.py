@@ -0,0 +1,27 @@
+"""
+Date parsing helpers for admin forms and filters.
+"""
+from datetime import datetime, timedelta
+from typing import Optional
+
+
+# Admin panel shows times shifted by +5 hours
+TZ_OFFSET = timedelta(hours=5)
+
+
+def parse_date(date_str: Optional[str]) -> Optional[datetime]:
+    """Parse date string to datetime."""
+    if not date_str:
+        return None
+    try:
+        # ISO "YYYY-MM-DD" from date inputs, parsed without strptime format handling
+        return datetime.fromisoformat(date_str)
+    except ValueError:
+        return None
+
+
+def format_local_datetime(value: datetime) -> str:
+    """Format datetime with TZ_OFFSET as "30.01.2026 12:00"."""
+    value = value + TZ_OFFSET
+    # Direct formatting is several times faster than strftime
+    return f"{value.day:02d}.{value.month:02d}.{value.year} {value.hour:02d}:{value.minute:02d}"
@@ -2,217 +2,415 @@
 Export utilities for generating Excel reports.
 """
 import io
-from datetime import datetime, timedelta
-from typing import List, Optional
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, Border, Side, PatternFill
-from openpyxl.utils import get_column_letter
+import re
+import tempfile
+import zipfile
+import functools
+import orjson
+from typing import Optional, Sequence, Iterable, Iterator, BinaryIO, NamedTuple, TYPE_CHECKING
+from xml.sax.saxutils import escape, quoteattr
 
+from admin.utils.dates import format_local_datetime
 
-def export_applications_to_xlsx(applications: List, nominations: dict = None) -> io.BytesIO:
+if TYPE_CHECKING:
+    # Annotations only; openpyxl is imported lazily in get_cell_styles
+    from openpyxl.styles import Font, PatternFill, Alignment, Border
+
+
+# Exports up to this size stay in memory, larger ones spill to a temp file
+SPOOL_MAX_SIZE = 10 * 1024 * 1024
+# Chunk size for streaming export files to the client
+STREAM_CHUNK_SIZE = 64 * 1024
+# Exports with more rows are written as raw XML instead of through openpyxl
+XML_EXPORT_THRESHOLD = 2000
+
+APPLICATION_HEADERS = (
+    "ID",
+    "Дата подачи",
+    "ФИО",
+    "Telegram",
+    "Город",
+    "Школа",
+    "Класс",
+    "Этап",
+    "Кол-во файлов",
+    "Комментарий",
+    "Голосовое"
+)
+APPLICATION_COLUMN_WIDTHS = (6, 16, 25, 18, 15, 30, 8, 20, 12, 40, 10)
+
+PARTICIPANT_HEADERS = (
+    "ID",
+    "Telegram",
+    "ФИО",
+    "Город",
+    "Школа",
+    "Класс",
+    "Кол-во заявок",
+    "Последняя заявка",
+    "Дата регистрации"
+)
+PARTICIPANT_COLUMN_WIDTHS = (6, 18, 25, 15, 30, 8, 12, 16, 16)
+
+
+class CellStyles(NamedTuple):
+    """openpyxl cell styles shared by all exports."""
+    header_font: "Font"
+    header_fill: "PatternFill"
+    header_alignment: "Alignment"
+    body_alignment: "Alignment"
+    thin_border: "Border"
+
+
+@functools.lru_cache(maxsize=None)
+def get_cell_styles() -> CellStyles:
     """
-    Export applications to Excel file.
-    
-    Args:
-        applications: List of Application objects with related User and Nomination
-        nominations: Optional dict of nomination_id -> nomination_name for headers
-    
-    Returns:
-        BytesIO buffer containing the Excel file
+    Build export cell styles once.
+    openpyxl is imported lazily, so app startup doesn't pay for it.
     """
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Заявки"
-    
-    # Styles
-    header_font = Font(bold=True, color="FFFFFF")
-    header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-    header_alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
-    
-    thin_border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
+    from openpyxl.styles import Font, Alignment, Border, Side, PatternFill
+    
+    return CellStyles(
+        header_font=Font(bold=True, color="FFFFFF"),
+        header_fill=PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid"),
+        header_alignment=Alignment(horizontal="center", vertical="center", wrap_text=True),
+        body_alignment=Alignment(vertical="center", wrap_text=True),
+        thin_border=Border(
+            left=Side(style='thin'),
+            right=Side(style='thin'),
+            top=Side(style='thin'),
+            bottom=Side(style='thin')
+        )
     )
+
+
+def column_letter(col: int) -> str:
+    """Excel column letter for 1-based column index (1 -> A, 27 -> AA)."""
+    letters = ""
+    while col:
+        col, remainder = divmod(col - 1, 26)
+        letters = chr(ord("A") + remainder) + letters
+    return letters
+
+
+def iter_file_chunks(file: BinaryIO, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Read file in chunks for StreamingResponse and close it afterwards.
+    """
+    try:
+        while chunk := file.read(chunk_size):
+            yield chunk
+    finally:
+        file.close()
+
+
+def _count_json_list(value: Optional[str]) -> int:
+    """Length of a JSON list stored as text, 0 if empty or not a list."""
+    if not value:
+        return 0
+    # Bot stores lists of Telegram file_ids: without escapes every
+    # string is exactly two quotes, so the count needs no parsing
+    if value.startswith('["') and value.endswith('"]') and '\\' not in value:
+        return value.count('"') // 2
+    try:
+        items = orjson.loads(value)
+    except orjson.JSONDecodeError:
+        return 0
+    return len(items) if isinstance(items, list) else 0
+
+
+def _application_row(app) -> list:
+    """Build export row values for an application."""
+    # Parse files count
+    files_count = _count_json_list(app.photos)
     
-    # Headers
-    headers = [
-        "ID",
-        "Дата подачи",
-        "ФИО",
-        "Telegram",
-        "Город",
-        "Школа",
-        "Класс",
-        "Этап",
-        "Кол-во файлов",
-        "Комментарий",
-        "Голосовое"
+    # Format datetime with +5 hours
+    created_at_str = format_local_datetime(app.created_at) if app.created_at else ""
+    
+    # Resolve relationships once per row
+    user = app.user
+    nomination = app.nomination
+    
+    return [
+        app.id,
+        created_at_str,
+        user.full_name or "",
+        f"@{user.username}" if user.username else str(user.telegram_id),
+        user.city or "",
+        user.school or "",
+        user.grade or "",
+        nomination.name if nomination else "",
+        files_count,
+        app.comment_text or "",
+        "Да" if app.voice_file_id else "Нет"
     ]
+
+
+def _participant_row(item: dict) -> list:
+    """Build export row values for a participant with stats."""
+    user = item['user']
     
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col, value=header)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = header_alignment
-        cell.border = thin_border
+    # Format dates with +5 hours
+    last_app = item.get('last_application_date')
+    last_app_str = format_local_datetime(last_app) if last_app else ""
+    created_at_str = format_local_datetime(user.created_at) if user.created_at else ""
     
-    # Data rows
-    for row_num, app in enumerate(applications, 2):
-        # Parse files count
-        files_count = 0
-        if app.photos:
-            try:
-                import json
-                photos = json.loads(app.photos)
-                files_count += len(photos) if isinstance(photos, list) else 0
-            except:
-                pass
-        if hasattr(app, 'files') and app.files:
-            try:
-                import json
-                files = json.loads(app.files)
-                files_count += len(files) if isinstance(files, list) else 0
-            except:
-                pass
-        
-        # Format datetime with +5 hours
-        created_at = app.created_at
-        if created_at:
-            created_at = created_at + timedelta(hours=5)
-            created_at_str = created_at.strftime("%d.%m.%Y %H:%M")
-        else:
-            created_at_str = ""
-        
-        row_data = [
-            app.id,
-            created_at_str,
-            app.user.full_name or "",
-            f"@{app.user.username}" if app.user.username else str(app.user.telegram_id),
-            app.user.city or "",
-            app.user.school or "",
-            app.user.grade or "",
-            app.nomination.name if app.nomination else "",
-            files_count,
-            app.comment_text or "",
-            "Да" if app.voice_file_id else "Нет"
-        ]
-        
-        for col, value in enumerate(row_data, 1):
-            cell = ws.cell(row=row_num, column=col, value=value)
-            cell.border = thin_border
-            cell.alignment = Alignment(vertical="center", wrap_text=True)
+    return [
+        user.id,
+        f"@{user.username}" if user.username else str(user.telegram_id),
+        user.full_name or "",
+        user.city or "",
+        user.school or "",
+        user.grade or "",
+        item.get('application_count', 0),
+        last_app_str,
+        created_at_str
+    ]
+
+
+def _write_xlsx(
+    headers: Sequence[str],
+    rows: Iterable[list],
+    column_widths: Sequence[int],
+    sheet_title: str
+) -> BinaryIO:
+    """
+    Write rows to a styled Excel file with openpyxl.
     
-    # Adjust column widths
-    column_widths = [6, 16, 25, 18, 15, 30, 8, 20, 12, 40, 10]
-    for col, width in enumerate(column_widths, 1):
-        ws.column_dimensions[get_column_letter(col)].width = width
+    Uses openpyxl write-only mode: rows are serialized as they are appended,
+    so memory does not grow with the number of rows.
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import NamedStyle
+    
+    styles = get_cell_styles()
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(sheet_title)
+    
+    # Body cells share one named style, assigning it is much cheaper
+    # than setting border and alignment on every cell.
+    # Named styles are bound to their workbook, so it is created per export.
+    body_style = NamedStyle(name="body", border=styles.thin_border, alignment=styles.body_alignment)
+    wb.add_named_style(body_style)
     
-    # Freeze header row
+    # Column widths and frozen header must be set before the first row
+    for col, width in enumerate(column_widths, 1):
+        ws.column_dimensions[column_letter(col)].width = width
     ws.freeze_panes = "A2"
     
-    # Save to BytesIO
-    output = io.BytesIO()
+    # Headers
+    header_cells = []
+    for header in headers:
+        cell = WriteOnlyCell(ws, value=header)
+        cell.font = styles.header_font
+        cell.fill = styles.header_fill
+        cell.alignment = styles.header_alignment
+        cell.border = styles.thin_border
+        header_cells.append(cell)
+    ws.append(header_cells)
+    
+    # Data rows
+    for row_data in rows:
+        row_cells = []
+        for value in row_data:
+            cell = WriteOnlyCell(ws, value=value)
+            cell.style = body_style
+            row_cells.append(cell)
+        ws.append(row_cells)
+    
+    # Save to temporary file (kept in memory until it grows large)
+    output = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
     wb.save(output)
     output.seek(0)
     
     return output
 
 
-def export_participants_to_xlsx(participants: List) -> io.BytesIO:
+# Static package parts for _write_xlsx_stream
+_XLSX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+
+_XLSX_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+_XLSX_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/>'
+    '</Relationships>'
+)
+
+# Same look as _write_xlsx: style 1 is the header, style 2 the body cells
+_XLSX_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<fonts count="2">'
+    '<font><sz val="11"/><name val="Calibri"/><family val="2"/></font>'
+    '<font><b/><sz val="11"/><color rgb="FFFFFFFF"/><name val="Calibri"/><family val="2"/></font>'
+    '</fonts>'
+    '<fills count="3">'
+    '<fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill>'
+    '<fill><patternFill patternType="solid"><fgColor rgb="FF4472C4"/><bgColor rgb="FF4472C4"/></patternFill></fill>'
+    '</fills>'
+    '<borders count="2">'
+    '<border><left/><right/><top/><bottom/><diagonal/></border>'
+    '<border><left style="thin"/><right style="thin"/><top style="thin"/><bottom style="thin"/><diagonal/></border>'
+    '</borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="3">'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="0" fontId="1" fillId="2" borderId="1" xfId="0" '
+    'applyFont="1" applyFill="1" applyBorder="1" applyAlignment="1">'
+    '<alignment horizontal="center" vertical="center" wrapText="1"/></xf>'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="1" xfId="0" applyBorder="1" applyAlignment="1">'
+    '<alignment vertical="center" wrapText="1"/></xf>'
+    '</cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+
+# Control characters are not allowed in XML text
+_ILLEGAL_XML_CHARS_RE = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def _xlsx_cell(ref: str, value, style: int) -> str:
+    """Render a single worksheet cell."""
+    if value is None or value == "":
+        return f'<c r="{ref}" s="{style}"/>'
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return f'<c r="{ref}" s="{style}"><v>{value}</v></c>'
+    text = escape(_ILLEGAL_XML_CHARS_RE.sub("", str(value)))
+    return f'<c r="{ref}" s="{style}" t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _write_xlsx_stream(
+    headers: Sequence[str],
+    rows: Iterable[list],
+    column_widths: Sequence[int],
+    sheet_title: str
+) -> BinaryIO:
     """
-    Export participants to Excel file.
-    
-    Args:
-        participants: List of dicts with 'user', 'application_count', 'last_application_date'
+    Write rows to an Excel file by generating the worksheet XML directly.
     
-    Returns:
-        BytesIO buffer containing the Excel file
+    Produces the same layout and styles as _write_xlsx without creating
+    openpyxl cell and style objects, for large exports.
     """
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Участники"
-    
-    # Styles
-    header_font = Font(bold=True, color="FFFFFF")
-    header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-    header_alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
-    
-    thin_border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
-    )
+    letters = [column_letter(col) for col in range(1, len(headers) + 1)]
     
-    # Headers
-    headers = [
-        "ID",
-        "Telegram",
-        "ФИО",
-        "Город",
-        "Школа",
-        "Класс",
-        "Кол-во заявок",
-        "Последняя заявка",
-        "Дата регистрации"
-    ]
+    output = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("[Content_Types].xml", _XLSX_CONTENT_TYPES)
+        zf.writestr("_rels/.rels", _XLSX_ROOT_RELS)
+        zf.writestr("xl/_rels/workbook.xml.rels", _XLSX_WORKBOOK_RELS)
+        zf.writestr("xl/styles.xml", _XLSX_STYLES)
+        zf.writestr(
+            "xl/workbook.xml",
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            f'<sheets><sheet name={quoteattr(sheet_title)} sheetId="1" r:id="rId1"/></sheets>'
+            '</workbook>'
+        )
+        
+        with zf.open("xl/worksheets/sheet1.xml", "w") as raw, \
+                io.TextIOWrapper(raw, encoding="utf-8") as sheet:
+            sheet.write(
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+                'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+                # Frozen header row
+                '<sheetViews><sheetView workbookViewId="0">'
+                '<pane ySplit="1" topLeftCell="A2" activePane="bottomLeft" state="frozen"/>'
+                '</sheetView></sheetViews>'
+                '<cols>'
+            )
+            for col, width in enumerate(column_widths, 1):
+                sheet.write(f'<col min="{col}" max="{col}" width="{width}" customWidth="1"/>')
+            sheet.write('</cols><sheetData>')
+            
+            header_cells = "".join(
+                _xlsx_cell(f"{letter}1", header, 1) for letter, header in zip(letters, headers)
+            )
+            sheet.write(f'<row r="1">{header_cells}</row>')
+            
+            for row_num, row_data in enumerate(rows, 2):
+                cells = "".join(
+                    _xlsx_cell(f"{letter}{row_num}", value, 2)
+                    for letter, value in zip(letters, row_data)
+                )
+                sheet.write(f'<row r="{row_num}">{cells}</row>')
+            
+            sheet.write('</sheetData></worksheet>')
     
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col, value=header)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = header_alignment
-        cell.border = thin_border
+    output.seek(0)
+    return output
+
+
+def _select_writer(row_count: int):
+    """
+    Pick the Excel writer for an export of row_count rows.
+    Large exports skip openpyxl object overhead, and so do empty ones
+    (header-only file, no need to load openpyxl at all).
+    """
+    if row_count == 0 or row_count > XML_EXPORT_THRESHOLD:
+        return _write_xlsx_stream
+    return _write_xlsx
+
+
+def export_applications_to_xlsx(applications: Sequence, nominations: dict = None) -> BinaryIO:
+    """
+    Export applications to Excel file.
     
-    # Data rows
-    for row_num, item in enumerate(participants, 2):
-        user = item['user']
-        
-        # Format dates with +5 hours
-        last_app = item.get('last_application_date')
-        if last_app:
-            last_app = last_app + timedelta(hours=5)
-            last_app_str = last_app.strftime("%d.%m.%Y %H:%M")
-        else:
-            last_app_str = ""
-        
-        created_at = user.created_at
-        if created_at:
-            created_at = created_at + timedelta(hours=5)
-            created_at_str = created_at.strftime("%d.%m.%Y %H:%M")
-        else:
-            created_at_str = ""
-        
-        row_data = [
-            user.id,
-            f"@{user.username}" if user.username else str(user.telegram_id),
-            user.full_name or "",
-            user.city or "",
-            user.school or "",
-            user.grade or "",
-            item.get('application_count', 0),
-            last_app_str,
-            created_at_str
-        ]
-        
-        for col, value in enumerate(row_data, 1):
-            cell = ws.cell(row=row_num, column=col, value=value)
-            cell.border = thin_border
-            cell.alignment = Alignment(vertical="center", wrap_text=True)
+    CPU-bound and synchronous: call it from routes via asyncio.to_thread.
     
-    # Adjust column widths
-    column_widths = [6, 18, 25, 15, 30, 8, 12, 16, 16]
-    for col, width in enumerate(column_widths, 1):
-        ws.column_dimensions[get_column_letter(col)].width = width
+    Args:
+        applications: Sequence of Application objects with related User and Nomination
+        nominations: Optional dict of nomination_id -> nomination_name for headers
     
-    # Freeze header row
-    ws.freeze_panes = "A2"
+    Returns:
+        Temporary file (spooled to disk when large) containing the Excel file
+    """
+    rows = (_application_row(app) for app in applications)
+    writer = _select_writer(len(applications))
+    return writer(APPLICATION_HEADERS, rows, APPLICATION_COLUMN_WIDTHS, "Заявки")
+
+
+def export_participants_to_xlsx(participants: Sequence) -> BinaryIO:
+    """
+    Export participants to Excel file.
     
-    # Save to BytesIO
-    output = io.BytesIO()
-    wb.save(output)
-    output.seek(0)
+    CPU-bound and synchronous: call it from routes via asyncio.to_thread.
     
-    return output
+    Args:
+        participants: Sequence of dicts with 'user', 'application_count', 'last_application_date'
+    
+    Returns:
+        Temporary file (spooled to disk when large) containing the Excel file
+    """
+    rows = (_participant_row(item) for item in participants)
+    writer = _select_writer(len(participants))
+    return writer(PARTICIPANT_HEADERS, rows, PARTICIPANT_COLUMN_WIDTHS, "Участники")
@@ -1,9 +1,11 @@
 """Custom Jinja2 filters for admin templates."""
-import json
+import orjson
 from typing import Any
-from datetime import datetime, timedelta
+from datetime import datetime
+from markupsafe import Markup
 
 from admin.utils.csrf import generate_csrf_token
+from admin.utils.dates import format_local_datetime
 
 
 def from_json(value: str) -> Any:
@@ -18,8 +20,8 @@ def from_json(value: str) -> Any:
     if not value:
         return []
     try:
-        return json.loads(value)
-    except (json.JSONDecodeError, TypeError):
+        return orjson.loads(value)
+    except (orjson.JSONDecodeError, TypeError):
         return []
 
 
@@ -35,23 +37,27 @@ def format_datetime(value) -> str:
     if not value:
         return "—"
     if isinstance(value, datetime):
-        # Add 5 hours for timezone offset
-        adjusted = value + timedelta(hours=5)
-        return adjusted.strftime('%d.%m.%Y %H:%M')
+        return format_local_datetime(value)
     return str(value)
 
 
-def csrf_token_input(request) -> str:
+def csrf_token_input(request) -> Markup:
     """Generate hidden input with CSRF token.
     
+    The input is built once per request and reused by every form on the page.
+    
     Args:
         request: FastAPI Request object
         
     Returns:
-        HTML hidden input string
+        HTML hidden input markup
     """
-    token = generate_csrf_token(request)
-    return f'<input type="hidden" name="csrf_token" value="{token}">'
+    html = getattr(request.state, "csrf_token_input", None)
+    if html is None:
+        token = generate_csrf_token(request)
+        html = Markup('<input type="hidden" name="csrf_token" value="%s">') % token
+        request.state.csrf_token_input = html
+    return html
 
 
 def setup_jinja_filters(templates):
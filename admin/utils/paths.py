@@ -0,0 +1,13 @@
+"""
+Filesystem paths used by the admin panel, computed once at import.
+"""
+from pathlib import Path
+
+
+ADMIN_ROOT = Path(__file__).resolve().parent.parent
+PROJECT_ROOT = ADMIN_ROOT.parent
+
+TEMPLATES_DIR = ADMIN_ROOT / "templates"
+STATIC_DIR = ADMIN_ROOT / "static"
+UPLOADS_DIR = PROJECT_ROOT / "uploads"
+LOGS_DIR = PROJECT_ROOT / "logs"
@@ -0,0 +1,32 @@
+"""
+Shared Jinja2 templates instance for all admin routers.
+Templates are compiled once per process and reused by every route.
+"""
+from fastapi.templating import Jinja2Templates
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache
+
+from config import settings
+from admin.utils.jinja_filters import setup_jinja_filters
+from admin.utils.paths import TEMPLATES_DIR
+
+
+_env = Environment(
+    loader=FileSystemLoader(TEMPLATES_DIR),
+    autoescape=True,
+    cache_size=400,
+    # Compiled template bytecode, kept across restarts. Without a directory
+    # Jinja uses a private per-user temp dir (0700, ownership checked)
+    bytecode_cache=FileSystemBytecodeCache(),
+    # Skip template mtime checks in production
+    auto_reload=settings.debug
+)
+
+templates = Jinja2Templates(env=_env)
+
+setup_jinja_filters(templates)
+
+
+def preload_templates() -> None:
+    """Compile all templates up front so the first requests don't pay for it."""
+    for name in _env.list_templates(extensions=["html"]):
+        _env.get_template(name)
@@ -3,16 +3,20 @@ from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from datetime import datetime
-import json
+import asyncio
+import logging
+import orjson
+from typing import List, Optional, Tuple
 
 from database.database import async_session
 from database import crud
 from bot.keyboards.menus import (
+    CANCEL_TEXT,
     get_main_menu, 
     get_cancel_menu, 
     get_stages_keyboard
 )
-from bot.utils.local_storage import save_file, create_user_folder
+from bot.utils.local_storage import build_file_path, create_user_folder
 from bot.utils.validation import validate_fio, validate_city, validate_school, validate_grade
 from config import settings
 
@@ -34,6 +38,7 @@ TEXTS = {
     
     "error_not_photo": "❗️ Пожалуйста, отправь фотографию или PDF-файл",
     "error_photo_count": "🫠 Максимум {count} файлов. Отправь комментарий.",
+    "error_extra_file_count": "У вас уже {count} файлов. Теперь отправьте комментарий (текст или голосовое).",
     "error_photo_null": "😱 Вы не загрузили файлы",
     "error_voice_length": "ℹ️ Ваше голосовое превышает 1 минуту. Отправь еще раз но в пределах 1 минуты",
     "error_file_too_large": "❗️ Файл слишком большой! Максимальный размер: {max_size} МБ",
@@ -49,6 +54,19 @@ MAX_FILES = 5
 MIN_FILES = 3
 MAX_VOICE_DURATION = 60  # секунд
 
+# Допустимые расширения документов
+_IMAGE_EXTS = frozenset({'jpg', 'jpeg', 'png', 'gif', 'bmp', 'webp'})
+_ALLOWED_EXTS = _IMAGE_EXTS | {'pdf'}
+
+# Лимит размера файла из настроек, читается один раз
+_MAX_FILE_SIZE_BYTES = settings.max_file_size_bytes
+
+# Тексты с постоянными подстановками, форматируются один раз
+_GET_PHOTOS_TEXT = TEXTS["get_photos"].format(max_size=settings.max_file_size_mb)
+_FILE_TOO_LARGE_TEXT = TEXTS["error_file_too_large"].format(max_size=settings.max_file_size_mb)
+_PHOTO_COUNT_TEXT = TEXTS["error_photo_count"].format(count=MAX_FILES)
+_EXTRA_FILE_COUNT_TEXT = TEXTS["error_extra_file_count"].format(count=MAX_FILES)
+
 
 class ApplicationForm(StatesGroup):
     """States for application submission."""
@@ -61,6 +79,18 @@ class ApplicationForm(StatesGroup):
     entering_comment = State()
 
 
+# Registered first, so it catches cancellation in every state
+@router.message(F.text == CANCEL_TEXT)
+async def cancel_application(message: Message, state: FSMContext):
+    """Cancel application process."""
+    current_state = await state.get_state()
+    if current_state:
+        await state.clear()
+        await message.answer("❌ Подача заявки отменена.", reply_markup=get_main_menu())
+    else:
+        await message.answer("Выберите действие:", reply_markup=get_main_menu())
+
+
 @router.message(F.text == "📝 Подать заявку")
 async def start_application(message: Message, state: FSMContext):
     """Start the application process."""
@@ -108,10 +138,6 @@ async def start_application(message: Message, state: FSMContext):
 @router.message(ApplicationForm.entering_fio)
 async def process_fio(message: Message, state: FSMContext):
     """Process FIO input."""
-    if message.text == "❌ Отмена":
-        await cancel_application(message, state)
-        return
-    
     # Validate FIO
     is_valid, result, normalized = validate_fio(message.text)
     
@@ -127,10 +153,6 @@ async def process_fio(message: Message, state: FSMContext):
 @router.message(ApplicationForm.entering_city)
 async def process_city(message: Message, state: FSMContext):
     """Process city input."""
-    if message.text == "❌ Отмена":
-        await cancel_application(message, state)
-        return
-    
     # Validate city
     is_valid, result, normalized = validate_city(message.text)
     
@@ -146,10 +168,6 @@ async def process_city(message: Message, state: FSMContext):
 @router.message(ApplicationForm.entering_school)
 async def process_school(message: Message, state: FSMContext):
     """Process school input."""
-    if message.text == "❌ Отмена":
-        await cancel_application(message, state)
-        return
-    
     # Validate school
     is_valid, result, normalized = validate_school(message.text)
     
@@ -165,10 +183,6 @@ async def process_school(message: Message, state: FSMContext):
 @router.message(ApplicationForm.entering_grade)
 async def process_grade(message: Message, state: FSMContext):
     """Process grade input."""
-    if message.text == "❌ Отмена":
-        await cancel_application(message, state)
-        return
-    
     # Validate grade
     is_valid, result, normalized = validate_grade(message.text)
     
@@ -218,12 +232,12 @@ async def process_stage_choice(callback: CallbackQuery, state: FSMContext):
         )
     
     # Initialize files list
-    await state.update_data(files=[], file_ids=[])
+    await state.update_data(files=[])
     
     await state.set_state(ApplicationForm.uploading_photos)
     await callback.message.edit_text(f"✅ Выбран этап: {stage.name}")
     await callback.message.answer(
-        TEXTS["get_photos"].format(max_size=settings.max_file_size_mb), 
+        _GET_PHOTOS_TEXT, 
         reply_markup=get_cancel_menu()
     )
     await callback.answer()
@@ -247,110 +261,114 @@ async def change_profile_data(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 
-@router.message(ApplicationForm.uploading_photos, F.photo)
-async def process_photo(message: Message, state: FSMContext):
-    """Process photo upload."""
-    data = await state.get_data()
-    files = data.get('files', [])
-    file_ids = data.get('file_ids', [])
-    
-    if len(files) >= MAX_FILES:
-        await message.answer(TEXTS["error_photo_count"].format(count=MAX_FILES))
-        return
-    
-    # Get the largest photo
-    photo = message.photo[-1]
-    
-    # Check file size
-    if photo.file_size and photo.file_size > settings.max_file_size_bytes:
-        await message.answer(TEXTS["error_file_too_large"].format(max_size=settings.max_file_size_mb))
-        return
-    
-    file_ids.append(photo.file_id)
-    files.append({
-        'file_id': photo.file_id,
-        'file_unique_id': photo.file_unique_id,
-        'type': 'photo',
-        'extension': '.jpg'
-    })
-    
-    await state.update_data(files=files, file_ids=file_ids)
-    await _send_file_status(message, state, files)
-
-
-@router.message(ApplicationForm.uploading_photos, F.document)
-async def process_document(message: Message, state: FSMContext):
-    """Process PDF document or image sent as document."""
-    data = await state.get_data()
-    files = data.get('files', [])
-    file_ids = data.get('file_ids', [])
-    
-    if len(files) >= MAX_FILES:
-        await message.answer(TEXTS["error_photo_count"].format(count=MAX_FILES))
-        return
+def _classify_document(file_name: str) -> Optional[Tuple[str, str]]:
+    """Return (file_type, extension) for a PDF or image document, None otherwise."""
+    _, dot, ext = file_name.lower().rpartition('.')
+    if not dot or ext not in _ALLOWED_EXTS:
+        return None
+    if ext == 'pdf':
+        return 'document', '.pdf'
+    return 'photo', f'.{ext}'
+
+
+def _build_file_entry(message: Message) -> Tuple[Optional[dict], Optional[str]]:
+    """Build the stored entry for an uploaded photo or document.
+    
+    Returns:
+        Tuple of (entry, error text); entry is None if the file is rejected
+    """
+    if message.photo:
+        # Get the largest photo
+        photo = message.photo[-1]
+        if photo.file_size and photo.file_size > _MAX_FILE_SIZE_BYTES:
+            return None, _FILE_TOO_LARGE_TEXT
+        return {
+            'file_id': photo.file_id,
+            'file_unique_id': photo.file_unique_id,
+            'type': 'photo',
+            'extension': '.jpg'
+        }, None
     
     document = message.document
     file_name = document.file_name or ""
-    file_name_lower = file_name.lower()
     
     # Check if it's PDF or image
-    is_pdf = file_name_lower.endswith('.pdf')
-    is_image = any(file_name_lower.endswith(ext) for ext in ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp'])
+    classified = _classify_document(file_name)
+    if classified is None:
+        return None, TEXTS["error_wrong_format"]
+    file_type, ext = classified
     
-    if not is_pdf and not is_image:
-        await message.answer(TEXTS["error_wrong_format"])
-        return
-    
-    # Check file size
-    if document.file_size > settings.max_file_size_bytes:
-        await message.answer(TEXTS["error_file_too_large"].format(max_size=settings.max_file_size_mb))
-        return
+    if document.file_size and document.file_size > _MAX_FILE_SIZE_BYTES:
+        return None, _FILE_TOO_LARGE_TEXT
     
-    # Determine extension
-    if is_pdf:
-        ext = '.pdf'
-        file_type = 'document'
-    else:
-        ext = '.' + file_name_lower.rsplit('.', 1)[-1] if '.' in file_name_lower else '.jpg'
-        file_type = 'photo'
-    
-    file_ids.append(document.file_id)
-    files.append({
+    return {
         'file_id': document.file_id,
         'file_unique_id': document.file_unique_id,
         'type': file_type,
         'extension': ext,
         'file_name': file_name
-    })
+    }, None
+
+
+async def _append_file(message: Message, state: FSMContext, limit_text: str) -> Optional[int]:
+    """Validate an uploaded file and add it to the application.
+    
+    Reads and writes the FSM data once.
     
-    await state.update_data(files=files, file_ids=file_ids)
-    await _send_file_status(message, state, files)
+    Returns:
+        New number of files, or None if the file was rejected
+    """
+    entry, error = _build_file_entry(message)
+    if entry is None:
+        await message.answer(error)
+        return None
+    
+    data = await state.get_data()
+    files = data.get('files', [])
+    if len(files) >= MAX_FILES:
+        await message.answer(limit_text)
+        return None
+    
+    files.append(entry)
+    # Write back the data already in hand: update_data would read it again
+    data['files'] = files
+    await state.set_data(data)
+    return len(files)
+
+
+@router.message(ApplicationForm.uploading_photos, F.photo)
+async def process_photo(message: Message, state: FSMContext):
+    """Process photo upload."""
+    count = await _append_file(message, state, _PHOTO_COUNT_TEXT)
+    if count is not None:
+        await _send_file_status(message, state, count)
+
+
+@router.message(ApplicationForm.uploading_photos, F.document)
+async def process_document(message: Message, state: FSMContext):
+    """Process PDF document or image sent as document."""
+    count = await _append_file(message, state, _PHOTO_COUNT_TEXT)
+    if count is not None:
+        await _send_file_status(message, state, count)
 
 
-async def _send_file_status(message: Message, state: FSMContext, files: list):
+async def _send_file_status(message: Message, state: FSMContext, count: int):
     """Send file upload status message."""
-    remaining = MAX_FILES - len(files)
+    remaining = MAX_FILES - count
     
-    if len(files) >= MIN_FILES:
+    if count >= MIN_FILES:
+        # One message instead of status + prompt: half the outbound API calls
+        await state.set_state(ApplicationForm.entering_comment)
         if remaining > 0:
             await message.answer(
-                f"✅ Файл {len(files)}/{MAX_FILES} получен.\n"
-                f"Можете отправить ещё {remaining} или напишите/запишите комментарий."
+                f"✅ Файл {count}/{MAX_FILES} получен.\n"
+                f"Можете отправить ещё {remaining} или напишите/запишите комментарий.\n\n"
+                f"{TEXTS['get_comment']}"
             )
-            await state.set_state(ApplicationForm.entering_comment)
-            await message.answer(TEXTS["get_comment"])
         else:
-            await message.answer(f"✅ Все {MAX_FILES} файлов получены!")
-            await state.set_state(ApplicationForm.entering_comment)
-            await message.answer(TEXTS["get_comment"])
+            await message.answer(f"✅ Все {MAX_FILES} файлов получены!\n\n{TEXTS['get_comment']}")
     else:
-        await message.answer(f"✅ Файл {len(files)}/{MAX_FILES} получен. Отправьте ещё минимум {MIN_FILES - len(files)}.")
-
-
-@router.message(ApplicationForm.uploading_photos, F.text == "❌ Отмена")
-async def cancel_photo_upload(message: Message, state: FSMContext):
-    """Cancel during photo upload."""
-    await cancel_application(message, state)
+        await message.answer(f"✅ Файл {count}/{MAX_FILES} получен. Отправьте ещё минимум {MIN_FILES - count}.")
 
 
 @router.message(ApplicationForm.uploading_photos)
@@ -365,10 +383,8 @@ async def process_invalid_file(message: Message, state: FSMContext):
         # Re-process as comment
         if message.voice:
             await process_voice_comment(message, state)
-        elif message.text and message.text != "❌ Отмена":
+        elif message.text:
             await process_text_comment(message, state)
-        elif message.text == "❌ Отмена":
-            await cancel_application(message, state)
         return
     
     await message.answer(TEXTS["error_not_photo"])
@@ -395,10 +411,6 @@ async def process_voice_comment(message: Message, state: FSMContext):
 @router.message(ApplicationForm.entering_comment, F.text)
 async def process_text_comment(message: Message, state: FSMContext):
     """Process text comment."""
-    if message.text == "❌ Отмена":
-        await cancel_application(message, state)
-        return
-    
     await state.update_data(
         comment_text=message.text,
         voice_file_id=None
@@ -407,91 +419,89 @@ async def process_text_comment(message: Message, state: FSMContext):
     await finish_application(message, state)
 
 
+async def _send_extra_file_status(message: Message, count: int):
+    """Send status message for a file added during comment stage."""
+    if count < MAX_FILES:
+        await message.answer(f"✅ Файл {count}/{MAX_FILES}. Можете отправить ещё или напишите комментарий.")
+    else:
+        await message.answer(f"✅ Все {MAX_FILES} файлов! Теперь отправьте комментарий.")
+
+
 @router.message(ApplicationForm.entering_comment, F.photo)
 async def process_extra_photo(message: Message, state: FSMContext):
     """Process additional photos during comment stage."""
-    data = await state.get_data()
-    files = data.get('files', [])
-    file_ids = data.get('file_ids', [])
-    
-    if len(files) >= MAX_FILES:
-        await message.answer(
-            f"У вас уже {MAX_FILES} файлов. Теперь отправьте комментарий (текст или голосовое)."
-        )
-        return
-    
-    # Accept extra photo
-    photo = message.photo[-1]
-    file_ids.append(photo.file_id)
-    files.append({
-        'file_id': photo.file_id,
-        'file_unique_id': photo.file_unique_id,
-        'type': 'photo',
-        'extension': '.jpg'
-    })
-    
-    await state.update_data(files=files, file_ids=file_ids)
-    
-    remaining = MAX_FILES - len(files)
-    if remaining > 0:
-        await message.answer(f"✅ Файл {len(files)}/{MAX_FILES}. Можете отправить ещё или напишите комментарий.")
-    else:
-        await message.answer(f"✅ Все {MAX_FILES} файлов! Теперь отправьте комментарий.")
+    count = await _append_file(message, state, _EXTRA_FILE_COUNT_TEXT)
+    if count is not None:
+        await _send_extra_file_status(message, count)
 
 
 @router.message(ApplicationForm.entering_comment, F.document)
 async def process_extra_document(message: Message, state: FSMContext):
     """Process additional PDF or image during comment stage."""
-    data = await state.get_data()
-    files = data.get('files', [])
-    file_ids = data.get('file_ids', [])
-    
-    if len(files) >= MAX_FILES:
-        await message.answer(
-            f"У вас уже {MAX_FILES} файлов. Теперь отправьте комментарий (текст или голосовое)."
-        )
-        return
-    
-    document = message.document
-    file_name = document.file_name or ""
-    file_name_lower = file_name.lower()
-    
-    # Check if it's PDF or image
-    is_pdf = file_name_lower.endswith('.pdf')
-    is_image = any(file_name_lower.endswith(ext) for ext in ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp'])
-    
-    if not is_pdf and not is_image:
-        await message.answer(TEXTS["error_wrong_format"])
-        return
-    
-    if document.file_size > settings.max_file_size_bytes:
-        await message.answer(TEXTS["error_file_too_large"].format(max_size=settings.max_file_size_mb))
-        return
+    count = await _append_file(message, state, _EXTRA_FILE_COUNT_TEXT)
+    if count is not None:
+        await _send_extra_file_status(message, count)
+
+
+async def _fetch_and_save(file_id: str, file_name: str, folder_path: str) -> str:
+    """Download a file from Telegram and save it locally. Returns its web URL."""
+    from bot.main import bot
     
-    # Determine extension
-    if is_pdf:
-        ext = '.pdf'
-        file_type = 'document'
-    else:
-        ext = '.' + file_name_lower.rsplit('.', 1)[-1] if '.' in file_name_lower else '.jpg'
-        file_type = 'photo'
+    file_info = await bot.get_file(file_id)
+    file_path, web_url = build_file_path(file_name, folder_path)
+    # Stream straight to disk in chunks instead of buffering the whole file
+    await bot.download_file(file_info.file_path, destination=file_path)
+    return web_url
+
+
+async def _store_files(message: Message, data: dict) -> Tuple[List[str], Optional[str]]:
+    """Save application files and the voice comment locally.
     
-    file_ids.append(document.file_id)
-    files.append({
-        'file_id': document.file_id,
-        'file_unique_id': document.file_unique_id,
-        'type': file_type,
-        'extension': ext,
-        'file_name': file_name
-    })
+    Runs without a database session, so no connection is held during downloads.
     
-    await state.update_data(files=files, file_ids=file_ids)
+    Returns:
+        Tuple of (file web paths, voice web path or None)
+    """
+    files = data.get('files', [])
+    files_web_paths = []
+    voice_web_path = None
+    try:
+        username = message.from_user.username or str(message.from_user.id)
+        folder_path = await create_user_folder(username)
+        stage_id = data.get('stage_id')
+        
+        # Download everything concurrently: one round-trip instead of one per file
+        downloads = [
+            _fetch_and_save(
+                file_data['file_id'],
+                f"stage{stage_id}_file{i}{file_data.get('extension', '.jpg')}",
+                folder_path
+            )
+            for i, file_data in enumerate(files, 1)
+        ]
+        if data.get('voice_file_id'):
+            downloads.append(_fetch_and_save(
+                data['voice_file_id'],
+                f"stage{stage_id}_comment.ogg",
+                folder_path
+            ))
+        results = await asyncio.gather(*downloads, return_exceptions=True)
+        
+        for result in results[:len(files)]:
+            if isinstance(result, Exception):
+                logging.error(f"Failed to save file locally: {result}")
+            else:
+                files_web_paths.append(result)
+        
+        for result in results[len(files):]:
+            if isinstance(result, Exception):
+                logging.error(f"Failed to save voice locally: {result}")
+            else:
+                voice_web_path = result
+    except Exception as e:
+        logging.error(f"Failed to save files locally: {e}")
     
-    remaining = MAX_FILES - len(files)
-    if remaining > 0:
-        await message.answer(f"✅ Файл {len(files)}/{MAX_FILES}. Можете отправить ещё или напишите комментарий.")
-    else:
-        await message.answer(f"✅ Все {MAX_FILES} файлов! Теперь отправьте комментарий.")
+    return files_web_paths, voice_web_path
 
 
 async def finish_application(message: Message, state: FSMContext):
@@ -500,96 +510,45 @@ async def finish_application(message: Message, state: FSMContext):
     
     data = await state.get_data()
     
+    # Save files locally before taking a database connection
+    files_web_paths, voice_web_path = await _store_files(message, data)
+    
     async with async_session() as db:
-        # Update user profile
-        user = await crud.get_user_by_telegram_id(db, message.from_user.id)
-        if user:
-            await crud.update_user(
-                db, user.id,
-                full_name=data.get('full_name'),
-                city=data.get('city'),
-                school=data.get('school'),
-                grade=data.get('grade')
-            )
-        
-        # Save files locally (photos and PDFs)
-        files_web_paths = []
-        try:
-            from bot.main import bot
-            
-            username = message.from_user.username or str(message.from_user.id)
-            folder_path = await create_user_folder(username)
-            
-            for i, file_data in enumerate(data.get('files', []), 1):
-                file_info = await bot.get_file(file_data['file_id'])
-                file_bytes = await bot.download_file(file_info.file_path)
-                
-                ext = file_data.get('extension', '.jpg')
-                file_name = f"stage{data.get('stage_id')}_file{i}{ext}"
-                _, web_url = await save_file(
-                    file_bytes.read(),
-                    file_name,
-                    folder_path
-                )
-                files_web_paths.append(web_url)
-        except Exception as e:
-            import logging
-            logging.error(f"Failed to save files locally: {e}")
-        
-        # Save voice locally if exists
-        voice_web_path = None
-        if data.get('voice_file_id'):
-            try:
-                file_info = await bot.get_file(data['voice_file_id'])
-                file_bytes = await bot.download_file(file_info.file_path)
-                
-                file_name = f"stage{data.get('stage_id')}_comment.ogg"
-                _, voice_web_path = await save_file(
-                    file_bytes.read(),
-                    file_name,
-                    folder_path
-                )
-            except Exception as e:
-                import logging
-                logging.error(f"Failed to save voice locally: {e}")
+        # Update user profile (user_id is stored by start_application)
+        user_id = data['user_id']
+        await crud.update_user(
+            db, user_id,
+            full_name=data.get('full_name'),
+            city=data.get('city'),
+            school=data.get('school'),
+            grade=data.get('grade')
+        )
         
         # Create application
         application = await crud.create_application(
             db,
-            user_id=user.id,
+            user_id=user_id,
             nomination_id=data['stage_id'],
-            photos=json.dumps([f['file_id'] for f in data.get('files', [])]),
-            photos_remote_paths=json.dumps(files_web_paths),
+            photos=orjson.dumps([f['file_id'] for f in data.get('files', [])]).decode(),
+            photos_remote_paths=orjson.dumps(files_web_paths).decode(),
             comment_text=data.get('comment_text'),
             voice_file_id=data.get('voice_file_id'),
             voice_remote_path=voice_web_path
         )
-        
-        # Format notification for admins
-        notification = TEXTS["application_notify"].format(
-            id=application.id,
-            user=f"@{message.from_user.username}" if message.from_user.username else str(message.from_user.id),
-            name=data.get('full_name'),
-            city=data.get('city'),
-            school=data.get('school'),
-            grade=data.get('grade'),
-            stage=data.get('stage_name')
-        )
-        
-        # TODO: Send notification to admin chat
-        import logging
-        logging.info(f"New application: {notification}")
+    
+    # Format notification for admins
+    notification = TEXTS["application_notify"].format(
+        id=application.id,
+        user=f"@{message.from_user.username}" if message.from_user.username else str(message.from_user.id),
+        name=data.get('full_name'),
+        city=data.get('city'),
+        school=data.get('school'),
+        grade=data.get('grade'),
+        stage=data.get('stage_name')
+    )
+    
+    # TODO: Send notification to admin chat
+    logging.info(f"New application: {notification}")
     
     await state.clear()
     await message.answer(TEXTS["finish"], reply_markup=get_main_menu())
-
-
-@router.message(F.text == "❌ Отмена")
-async def cancel_application(message: Message, state: FSMContext):
-    """Cancel application process."""
-    current_state = await state.get_state()
-    if current_state:
-        await state.clear()
-        await message.answer("❌ Подача заявки отменена.", reply_markup=get_main_menu())
-    else:
-        await message.answer("Выберите действие:", reply_markup=get_main_menu())
@@ -1,7 +1,7 @@
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery
 from aiogram.filters import Command
-import json
+import orjson
 from datetime import timedelta
 
 from database.database import async_session
@@ -41,8 +41,8 @@ async def show_my_works(message: Message):
             files_count = 0
             if app.photos:
                 try:
-                    files_count = len(json.loads(app.photos))
-                except:
+                    files_count = len(orjson.loads(app.photos))
+                except (orjson.JSONDecodeError, TypeError):
                     pass
             
             # Comment type
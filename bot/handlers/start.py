@@ -17,13 +17,7 @@ async def cmd_start(message: Message):
     """Handle /start command."""
     async with async_session() as db:
         # Get or create user
-        user = await crud.get_user_by_telegram_id(db, message.from_user.id)
-        if not user:
-            user = await crud.create_user(
-                db,
-                telegram_id=message.from_user.id,
-                username=message.from_user.username
-            )
+        await crud.get_or_create_user(db, message.from_user.id, message.from_user.username)
         
         # Get welcome text from database or use default
         welcome_text = await crud.get_bot_content(db, "welcome_message")
@@ -1,54 +1,70 @@
 from aiogram.types import ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardMarkup, InlineKeyboardButton
-from typing import List
+from typing import List, Tuple
+import functools
 from database.models import Nomination
 
 
+CANCEL_TEXT = "❌ Отмена"
+
+MAIN_MENU = ReplyKeyboardMarkup(
+    keyboard=[
+        [KeyboardButton(text="📝 Подать заявку")],
+        [KeyboardButton(text="📋 Мои работы"), KeyboardButton(text="ℹ️ Информация")],
+        [KeyboardButton(text="❓ Помощь")]
+    ],
+    resize_keyboard=True
+)
+
+
 def get_main_menu() -> ReplyKeyboardMarkup:
     """Create main menu keyboard."""
-    keyboard = ReplyKeyboardMarkup(
-        keyboard=[
-            [KeyboardButton(text="📝 Подать заявку")],
-            [KeyboardButton(text="📋 Мои работы"), KeyboardButton(text="ℹ️ Информация")],
-            [KeyboardButton(text="❓ Помощь")]
-        ],
-        resize_keyboard=True
-    )
-    return keyboard
+    return MAIN_MENU
+
+
+CANCEL_MENU = ReplyKeyboardMarkup(
+    keyboard=[
+        [KeyboardButton(text=CANCEL_TEXT)]
+    ],
+    resize_keyboard=True
+)
 
 
 def get_cancel_menu() -> ReplyKeyboardMarkup:
     """Create cancel keyboard."""
-    keyboard = ReplyKeyboardMarkup(
-        keyboard=[
-            [KeyboardButton(text="❌ Отмена")]
-        ],
-        resize_keyboard=True
-    )
-    return keyboard
+    return CANCEL_MENU
+
+
+SKIP_KEYBOARD = ReplyKeyboardMarkup(
+    keyboard=[
+        [KeyboardButton(text="⏭ Пропустить")],
+        [KeyboardButton(text=CANCEL_TEXT)]
+    ],
+    resize_keyboard=True
+)
 
 
 def get_skip_keyboard() -> ReplyKeyboardMarkup:
     """Create skip/cancel keyboard."""
-    keyboard = ReplyKeyboardMarkup(
-        keyboard=[
-            [KeyboardButton(text="⏭ Пропустить")],
-            [KeyboardButton(text="❌ Отмена")]
-        ],
-        resize_keyboard=True
-    )
-    return keyboard
+    return SKIP_KEYBOARD
 
 
 def get_stages_keyboard(stages: List[Nomination], show_change_profile: bool = False) -> InlineKeyboardMarkup:
     """Create stages inline keyboard with stage names."""
+    # Stages come sorted by order from the query; keyboards are cached by the visible stage data
+    stage_buttons = tuple((stage.id, stage.name) for stage in stages)
+    return _build_stages_keyboard(stage_buttons, show_change_profile)
+
+
+@functools.lru_cache(maxsize=32)
+def _build_stages_keyboard(stage_buttons: Tuple[Tuple[int, str], ...], show_change_profile: bool) -> InlineKeyboardMarkup:
+    """Build stages keyboard from (stage_id, name) pairs."""
     buttons = []
     
-    # Sort by order and create buttons with names
-    for stage in sorted(stages, key=lambda x: x.order):
+    for stage_id, name in stage_buttons:
         buttons.append([
             InlineKeyboardButton(
-                text=stage.name,
-                callback_data=f"stage_{stage.id}"
+                text=name,
+                callback_data=f"stage_{stage_id}"
             )
         ])
     
@@ -69,17 +85,19 @@ def get_nominations_keyboard(nominations: List[Nomination]) -> InlineKeyboardMar
     return get_stages_keyboard(nominations)
 
 
+CONFIRM_KEYBOARD = InlineKeyboardMarkup(
+    inline_keyboard=[
+        [
+            InlineKeyboardButton(text="✅ Подтвердить", callback_data="confirm_yes"),
+            InlineKeyboardButton(text="❌ Отменить", callback_data="confirm_no")
+        ]
+    ]
+)
+
+
 def get_confirm_keyboard() -> InlineKeyboardMarkup:
     """Create confirmation keyboard."""
-    keyboard = InlineKeyboardMarkup(
-        inline_keyboard=[
-            [
-                InlineKeyboardButton(text="✅ Подтвердить", callback_data="confirm_yes"),
-                InlineKeyboardButton(text="❌ Отменить", callback_data="confirm_no")
-            ]
-        ]
-    )
-    return keyboard
+    return CONFIRM_KEYBOARD
 
 
 def get_application_detail_keyboard(application_id: int) -> InlineKeyboardMarkup:
@@ -40,7 +40,8 @@ dp.callback_query.middleware(ThrottlingMiddleware(
     spam_threshold=5,
     block_duration=60
 ))
-dp.message.middleware(FileUploadThrottlingMiddleware(
+# File limits only matter where files are accepted: the application router
+application.router.message.middleware(FileUploadThrottlingMiddleware(
     files_per_minute=10,     # Max 10 files per minute
     total_mb_per_hour=100    # Max 100 MB per hour
 ))
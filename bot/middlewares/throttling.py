@@ -5,7 +5,7 @@ Limits message frequency per user.
 import time
 import logging
 from typing import Any, Awaitable, Callable, Dict
-from collections import defaultdict
+from collections import OrderedDict, defaultdict, deque
 
 from aiogram import BaseMiddleware
 from aiogram.types import Message, CallbackQuery, TelegramObject
@@ -13,57 +13,59 @@ from aiogram.types import Message, CallbackQuery, TelegramObject
 logger = logging.getLogger(__name__)
 
 
+class _UserBucket:
+    """Per-user token bucket state."""
+    __slots__ = ('tokens', 'last_refill', 'blocked_until', 'last_warning')
+    
+    def __init__(self, tokens: float, now: float):
+        self.tokens = tokens
+        self.last_refill = now
+        self.blocked_until = 0.0
+        self.last_warning = 0.0
+
+
+class _UploadWindow:
+    """Per-user file upload history."""
+    __slots__ = ('files', 'minute', 'total_mb', 'last_warning')
+    
+    def __init__(self):
+        self.files = deque()      # (timestamp, size_mb) in the last hour
+        self.minute = deque()     # timestamps in the last minute
+        self.total_mb = 0.0       # running sum of size_mb in files
+        self.last_warning = 0.0
+
+
 class ThrottlingMiddleware(BaseMiddleware):
     """
     Middleware to limit message rate per user.
     
     Features:
-    - Per-user rate limiting
+    - Per-user token bucket: bursts up to spam_threshold, refilled one per limit
     - Different limits for messages and callbacks
-    - Automatic cleanup of old records
+    - Temporary block once the bucket is empty
+    - Bounded memory: least recently seen users are evicted
     - Warning messages to users who spam
     """
     
+    # Min seconds between warnings sent to a blocked user
+    WARNING_INTERVAL = 1.0
+    
     def __init__(
         self, 
-        message_limit: float = 0.5,      # Min seconds between messages
-        callback_limit: float = 0.3,      # Min seconds between callbacks
-        spam_threshold: int = 5,          # Warnings before temporary block
+        message_limit: float = 0.5,      # Seconds to refill one message token
+        callback_limit: float = 0.3,      # Seconds to refill one callback token
+        spam_threshold: int = 5,          # Bucket capacity (allowed burst)
         block_duration: int = 60,         # Block duration in seconds
-        cleanup_interval: int = 300       # Cleanup old records every N seconds
+        max_tracked_users: int = 50000    # Evict least recently seen users above this
     ):
         self.message_limit = message_limit
         self.callback_limit = callback_limit
         self.spam_threshold = spam_threshold
         self.block_duration = block_duration
-        self.cleanup_interval = cleanup_interval
-        
-        # Storage: {user_id: {'last_time': float, 'warnings': int, 'blocked_until': float}}
-        self.users: Dict[int, Dict[str, Any]] = defaultdict(
-            lambda: {'last_time': 0, 'warnings': 0, 'blocked_until': 0}
-        )
-        self.last_cleanup = time.time()
-    
-    def _cleanup_old_records(self):
-        """Remove records of users who haven't been active for a while."""
-        now = time.time()
-        if now - self.last_cleanup < self.cleanup_interval:
-            return
-        
-        self.last_cleanup = now
-        cutoff = now - self.cleanup_interval
+        self.max_tracked_users = max_tracked_users
         
-        # Find users to remove
-        to_remove = [
-            user_id for user_id, data in self.users.items()
-            if data['last_time'] < cutoff and data['blocked_until'] < now
-        ]
-        
-        for user_id in to_remove:
-            del self.users[user_id]
-        
-        if to_remove:
-            logger.debug(f"Throttling cleanup: removed {len(to_remove)} old records")
+        # Storage: {user_id: _UserBucket}, least recently seen first
+        self.users: Dict[int, _UserBucket] = OrderedDict()
     
     async def __call__(
         self,
@@ -86,25 +88,34 @@ class ThrottlingMiddleware(BaseMiddleware):
             return await handler(event, data)
         
         user_id = user.id
-        now = time.time()
-        user_data = self.users[user_id]
-        
-        # Periodic cleanup
-        self._cleanup_old_records()
+        now = time.monotonic()
+        
+        bucket = self.users.get(user_id)
+        if bucket is None:
+            # New users start with a full bucket
+            bucket = self.users[user_id] = _UserBucket(float(self.spam_threshold), now)
+            if len(self.users) > self.max_tracked_users:
+                self.users.popitem(last=False)
+        else:
+            self.users.move_to_end(user_id)
         
         # Check if user is blocked
-        if user_data['blocked_until'] > now:
-            remaining = int(user_data['blocked_until'] - now)
+        if bucket.blocked_until > now:
+            # Warn at most once per WARNING_INTERVAL, so a spam burst doesn't turn into API calls
+            if now - bucket.last_warning < self.WARNING_INTERVAL:
+                return  # Block the request
+            bucket.last_warning = now
+            
+            remaining = int(bucket.blocked_until - now)
             logger.warning(f"Blocked user {user_id} tried to send message. {remaining}s remaining.")
             
-            # Silently ignore or send one warning
             if isinstance(event, Message):
                 try:
                     await event.answer(
                         f"⚠️ Вы временно заблокированы за спам.\n"
                         f"Попробуйте через {remaining} секунд."
                     )
-                except:
+                except Exception:
                     pass
             elif isinstance(event, CallbackQuery):
                 try:
@@ -112,51 +123,43 @@ class ThrottlingMiddleware(BaseMiddleware):
                         f"⚠️ Подождите {remaining} сек.",
                         show_alert=True
                     )
-                except:
+                except Exception:
                     pass
             return  # Block the request
         
-        # Check rate limit
-        time_passed = now - user_data['last_time']
+        # Refill lazily: one token per `limit` seconds, up to the bucket capacity
+        tokens = min(self.spam_threshold, bucket.tokens + (now - bucket.last_refill) / limit)
+        bucket.last_refill = now
         
-        if time_passed < limit:
-            # Too fast - increment warnings
-            user_data['warnings'] += 1
-            user_data['last_time'] = now
+        if tokens < 1:
+            # Bucket is empty - block the user
+            bucket.tokens = tokens
+            bucket.blocked_until = now + self.block_duration
+            bucket.last_warning = now
             
-            logger.info(f"User {user_id} rate limited. Warning {user_data['warnings']}/{self.spam_threshold}")
+            logger.warning(f"User {user_id} blocked for {self.block_duration}s due to spam")
             
-            if user_data['warnings'] >= self.spam_threshold:
-                # Block the user
-                user_data['blocked_until'] = now + self.block_duration
-                user_data['warnings'] = 0
-                
-                logger.warning(f"User {user_id} blocked for {self.block_duration}s due to spam")
-                
-                if isinstance(event, Message):
-                    try:
-                        await event.answer(
-                            f"🚫 Вы отправляете сообщения слишком часто!\n"
-                            f"Временная блокировка на {self.block_duration} секунд."
-                        )
-                    except:
-                        pass
-                elif isinstance(event, CallbackQuery):
-                    try:
-                        await event.answer(
-                            f"🚫 Слишком много запросов! Блокировка на {self.block_duration} сек.",
-                            show_alert=True
-                        )
-                    except:
-                        pass
+            if isinstance(event, Message):
+                try:
+                    await event.answer(
+                        f"🚫 Вы отправляете сообщения слишком часто!\n"
+                        f"Временная блокировка на {self.block_duration} секунд."
+                    )
+                except Exception:
+                    pass
+            elif isinstance(event, CallbackQuery):
+                try:
+                    await event.answer(
+                        f"🚫 Слишком много запросов! Блокировка на {self.block_duration} сек.",
+                        show_alert=True
+                    )
+                except Exception:
+                    pass
             
             return  # Block the request
         
         # Request is allowed
-        user_data['last_time'] = now
-        # Gradually decrease warnings if user behaves
-        if user_data['warnings'] > 0 and time_passed > limit * 3:
-            user_data['warnings'] = max(0, user_data['warnings'] - 1)
+        bucket.tokens = tokens - 1
         
         return await handler(event, data)
 
@@ -175,10 +178,8 @@ class FileUploadThrottlingMiddleware(BaseMiddleware):
         self.files_per_minute = files_per_minute
         self.total_mb_per_hour = total_mb_per_hour
         
-        # Storage: {user_id: {'files': [(timestamp, size_mb), ...], 'last_warning': float}}
-        self.users: Dict[int, Dict] = defaultdict(
-            lambda: {'files': [], 'last_warning': 0}
-        )
+        # Storage: {user_id: _UploadWindow}
+        self.users: Dict[int, _UploadWindow] = defaultdict(_UploadWindow)
     
     async def __call__(
         self,
@@ -202,27 +203,29 @@ class FileUploadThrottlingMiddleware(BaseMiddleware):
         now = time.time()
         user_data = self.users[user_id]
         
-        # Clean old records (older than 1 hour)
-        user_data['files'] = [
-            (ts, size) for ts, size in user_data['files']
-            if now - ts < 3600
-        ]
+        files = user_data.files
+        minute = user_data.minute
+        
+        # Drop records older than 1 hour, keeping the running total in sync
+        while files and now - files[0][0] >= 3600:
+            user_data.total_mb -= files.popleft()[1]
+        if not files:
+            # Reset to avoid float drift from repeated subtraction
+            user_data.total_mb = 0.0
         
-        # Count files in last minute
-        files_last_minute = sum(
-            1 for ts, _ in user_data['files']
-            if now - ts < 60
-        )
+        # Drop timestamps older than 1 minute
+        while minute and now - minute[0] >= 60:
+            minute.popleft()
         
-        # Calculate total MB in last hour
-        total_mb = sum(size for _, size in user_data['files'])
+        files_last_minute = len(minute)
+        total_mb = user_data.total_mb
         
         file_size_mb = file_size / (1024 * 1024)
         
         # Check limits
         if files_last_minute >= self.files_per_minute:
-            if now - user_data['last_warning'] > 30:  # Warn max once per 30s
-                user_data['last_warning'] = now
+            if now - user_data.last_warning > 30:  # Warn max once per 30s
+                user_data.last_warning = now
                 await event.answer(
                     f"⚠️ Слишком много файлов! Максимум {self.files_per_minute} файлов в минуту.\n"
                     f"Подождите немного."
@@ -231,8 +234,8 @@ class FileUploadThrottlingMiddleware(BaseMiddleware):
             return
         
         if total_mb + file_size_mb > self.total_mb_per_hour:
-            if now - user_data['last_warning'] > 30:
-                user_data['last_warning'] = now
+            if now - user_data.last_warning > 30:
+                user_data.last_warning = now
                 await event.answer(
                     f"⚠️ Превышен лимит загрузки: {self.total_mb_per_hour} МБ в час.\n"
                     f"Вы загрузили: {total_mb:.1f} МБ"
@@ -241,6 +244,8 @@ class FileUploadThrottlingMiddleware(BaseMiddleware):
             return
         
         # Record this file
-        user_data['files'].append((now, file_size_mb))
+        files.append((now, file_size_mb))
+        minute.append(now)
+        user_data.total_mb = total_mb + file_size_mb
         
         return await handler(event, data)
@@ -1,2 +1,2 @@
 # Utils module
-from .local_storage import save_file, create_user_folder, delete_file
+from .local_storage import build_file_path, create_user_folder, delete_file
@@ -4,7 +4,8 @@ Handles file uploads and folder management on local filesystem.
 """
 import os
 import re
-import aiofiles
+import asyncio
+import functools
 from typing import Tuple
 from datetime import datetime
 
@@ -14,6 +15,18 @@ from config import settings
 # Base upload directory
 UPLOADS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "uploads")
 
+# Normalized once; traversal checks compare lexically, without filesystem calls
+_UPLOADS_ABS = os.path.abspath(UPLOADS_DIR)
+
+_FOLDER_UNSAFE_RE = re.compile(r'[^a-zA-Z0-9_\-@]')
+_FILENAME_UNSAFE_RE = re.compile(r'[^a-zA-Z0-9_\-]')
+_ALLOWED_EXTENSIONS = frozenset({'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp', '.pdf', '.ogg'})
+
+
+def _is_within_uploads(path: str) -> bool:
+    """Check that path is inside the uploads directory."""
+    return os.path.commonpath([os.path.abspath(path), _UPLOADS_ABS]) == _UPLOADS_ABS
+
 
 def get_uploads_dir() -> str:
     """Get base uploads directory, create if not exists."""
@@ -22,6 +35,7 @@ def get_uploads_dir() -> str:
     return UPLOADS_DIR
 
 
+@functools.lru_cache(maxsize=4096)
 def sanitize_folder_name(name: str) -> str:
     """
     Sanitize folder name to prevent path traversal attacks.
@@ -33,7 +47,7 @@ def sanitize_folder_name(name: str) -> str:
     name = name.replace('/', '').replace('\\', '').replace('..', '')
     
     # Only allow safe characters: alphanumeric, underscore, hyphen, @
-    name = re.sub(r'[^a-zA-Z0-9_\-@]', '_', name)
+    name = _FOLDER_UNSAFE_RE.sub('_', name)
     
     # Limit length
     name = name[:64]
@@ -45,6 +59,7 @@ def sanitize_folder_name(name: str) -> str:
     return name
 
 
+@functools.lru_cache(maxsize=4096)
 def sanitize_filename(filename: str) -> str:
     """
     Sanitize filename to prevent path traversal and malicious files.
@@ -55,12 +70,11 @@ def sanitize_filename(filename: str) -> str:
     
     # Only allow safe characters in name part
     name, ext = os.path.splitext(filename)
-    name = re.sub(r'[^a-zA-Z0-9_\-]', '_', name)
+    name = _FILENAME_UNSAFE_RE.sub('_', name)
     
     # Validate extension
     ext = ext.lower()
-    allowed_extensions = ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp', '.pdf', '.ogg']
-    if ext not in allowed_extensions:
+    if ext not in _ALLOWED_EXTENSIONS:
         ext = '.bin'
     
     # Limit length
@@ -74,31 +88,25 @@ async def create_user_folder(username: str) -> str:
     Create a folder for user.
     Returns folder path.
     """
-    base_dir = get_uploads_dir()
+    base_dir = UPLOADS_DIR
     
     # Sanitize username to prevent path traversal
     safe_username = sanitize_folder_name(username)
     user_folder = os.path.join(base_dir, f"@{safe_username}")
     
     # Verify the path is still within uploads directory (extra safety)
-    real_user_folder = os.path.realpath(user_folder)
-    real_base_dir = os.path.realpath(base_dir)
-    if not real_user_folder.startswith(real_base_dir):
+    if not _is_within_uploads(user_folder):
         raise ValueError("Invalid folder path detected")
     
-    if not os.path.exists(user_folder):
-        os.makedirs(user_folder)
+    # Creates the uploads directory too; runs in a thread to keep the event loop free
+    await asyncio.to_thread(os.makedirs, user_folder, exist_ok=True)
     
     return user_folder
 
 
-async def save_file(
-    file_content: bytes,
-    file_name: str,
-    folder_path: str
-) -> Tuple[str, str]:
+def build_file_path(file_name: str, folder_path: str) -> Tuple[str, str]:
     """
-    Save file to local storage.
+    Build a unique local path for a file in the user folder.
     Returns tuple of (file_path, web_url).
     """
     # Sanitize filename
@@ -113,15 +121,9 @@ async def save_file(
     file_path = os.path.join(folder_path, new_filename)
     
     # Verify the path is within uploads directory
-    real_file_path = os.path.realpath(file_path)
-    real_uploads = os.path.realpath(UPLOADS_DIR)
-    if not real_file_path.startswith(real_uploads):
+    if not _is_within_uploads(file_path):
         raise ValueError("Invalid file path detected")
     
-    # Save file asynchronously
-    async with aiofiles.open(file_path, 'wb') as f:
-        await f.write(file_content)
-    
     # Generate relative web URL for serving via admin panel
     # Path relative to uploads folder
     rel_path = os.path.relpath(file_path, UPLOADS_DIR)
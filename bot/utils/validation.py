@@ -5,6 +5,11 @@ import re
 from typing import Tuple, Optional
 
 
+_FIO_RE = re.compile(r'^[а-яёА-ЯЁa-zA-Z\s\-]+$')
+_CITY_RE = re.compile(r'^[а-яёА-ЯЁa-zA-Z\s\-\.0-9]+$')
+_GRADE_RE = re.compile(r'^(\d{1,2})\s*([А-ЯЁA-Z])?$')
+
+
 def validate_fio(text: str) -> Tuple[bool, str, Optional[str]]:
     """
     Validate and normalize full name (ФИО).
@@ -33,7 +38,7 @@ def validate_fio(text: str) -> Tuple[bool, str, Optional[str]]:
         return False, "❌ Введите минимум фамилию и имя (например: Иванов Иван).", None
     
     # Check for valid characters (Cyrillic, Latin, hyphens, spaces)
-    if not re.match(r'^[а-яёА-ЯЁa-zA-Z\s\-]+$', text):
+    if not _FIO_RE.match(text):
         return False, "❌ ФИО должно содержать только буквы. Без цифр и спецсимволов.", None
     
     # Normalize: capitalize each word
@@ -60,7 +65,7 @@ def validate_city(text: str) -> Tuple[bool, str, Optional[str]]:
     text = ' '.join(text.split())
     
     # Check for valid characters
-    if not re.match(r'^[а-яёА-ЯЁa-zA-Z\s\-\.0-9]+$', text):
+    if not _CITY_RE.match(text):
         return False, "❌ Некорректное название. Используйте только буквы.", None
     
     # Normalize: capitalize first letter of each word
@@ -113,7 +118,7 @@ def validate_grade(text: str) -> Tuple[bool, str, Optional[str]]:
     text = text.strip().upper()
     
     # Extract number
-    match = re.match(r'^(\d{1,2})\s*([А-ЯЁA-Z])?$', text)
+    match = _GRADE_RE.match(text)
     
     if not match:
         return False, "❌ Укажите класс числом от 1 до 11 (например: 9 или 10А).", None
@@ -3,6 +3,7 @@ from pydantic import field_validator
 from typing import List
 import os
 import logging
+import functools
 
 logger = logging.getLogger(__name__)
 
@@ -34,11 +35,11 @@ class Settings(BaseSettings):
     # App settings
     debug: bool = False
     
-    @property
+    @functools.cached_property
     def max_file_size_bytes(self) -> int:
         return self.max_file_size_mb * 1024 * 1024
     
-    @property
+    @functools.cached_property
     def all_allowed_extensions(self) -> List[str]:
         return (
             self.allowed_image_extensions + 
@@ -1,2 +1,2 @@
-from .database import async_engine, async_session, get_db, init_db
+from .database import async_engine, async_session, get_db, init_db, run_in_session
 from .models import Base, User, Application, Nomination, Admin, BotContent, Settings
@@ -3,7 +3,8 @@ Database backup utilities.
 Provides automatic and manual backup functionality.
 """
 import os
-import shutil
+import sqlite3
+import heapq
 import asyncio
 import logging
 from datetime import datetime, timedelta
@@ -55,8 +56,16 @@ class BackupManager:
             backup_filename = f"bot_db_backup_{timestamp}{suffix_str}.db"
             backup_path = os.path.join(self.backup_dir, backup_filename)
             
-            # Copy database file
-            shutil.copy2(self.db_path, backup_path)
+            # Copy with SQLite's online backup API: consistent even if a write is in progress
+            source = sqlite3.connect(self.db_path)
+            try:
+                target = sqlite3.connect(backup_path)
+                try:
+                    source.backup(target)
+                finally:
+                    target.close()
+            finally:
+                source.close()
             
             logger.info(f"Backup created: {backup_path}")
             
@@ -69,22 +78,37 @@ class BackupManager:
             logger.error(f"Failed to create backup: {e}")
             return None
     
+    async def create_backup_async(self, suffix: str = "") -> Optional[str]:
+        """Create a backup in a worker thread, so the event loop is not blocked."""
+        return await asyncio.to_thread(self.create_backup, suffix)
+    
+    def _scan_backups(self) -> list:
+        """
+        Scan the backup directory in one pass.
+        
+        Returns:
+            List of (DirEntry, stat_result) tuples, unordered
+        """
+        with os.scandir(self.backup_dir) as it:
+            backups = [
+                (entry, entry.stat())
+                for entry in it
+                if entry.name.startswith("bot_db_backup_") and entry.name.endswith(".db")
+            ]
+        return backups
+    
     def _cleanup_old_backups(self):
         """Remove old backups keeping only max_backups most recent."""
         try:
-            backups = []
-            for f in os.listdir(self.backup_dir):
-                if f.startswith("bot_db_backup_") and f.endswith(".db"):
-                    path = os.path.join(self.backup_dir, f)
-                    backups.append((path, os.path.getmtime(path)))
-            
-            # Sort by modification time (newest first)
-            backups.sort(key=lambda x: x[1], reverse=True)
-            
-            # Remove old backups
-            for path, _ in backups[self.max_backups:]:
-                os.remove(path)
-                logger.info(f"Removed old backup: {path}")
+            backups = self._scan_backups()
+            excess = len(backups) - self.max_backups
+            if excess <= 0:
+                return
+            
+            # Remove old backups: only the oldest few need ordering
+            for entry, _ in heapq.nsmallest(excess, backups, key=lambda x: x[1].st_mtime):
+                os.remove(entry.path)
+                logger.info(f"Removed old backup: {entry.path}")
                 
         except Exception as e:
             logger.error(f"Failed to cleanup old backups: {e}")
@@ -94,21 +118,18 @@ class BackupManager:
         List all available backups.
         
         Returns:
-            List of dicts with backup info (path, size, date)
+            List of dicts with backup info (path, size, date), newest first
         """
         backups = []
         try:
-            for f in os.listdir(self.backup_dir):
-                if f.startswith("bot_db_backup_") and f.endswith(".db"):
-                    path = os.path.join(self.backup_dir, f)
-                    stat = os.stat(path)
-                    backups.append({
-                        'filename': f,
-                        'path': path,
-                        'size': stat.st_size,
-                        'size_mb': round(stat.st_size / (1024 * 1024), 2),
-                        'created': datetime.fromtimestamp(stat.st_mtime)
-                    })
+            for entry, stat in self._scan_backups():
+                backups.append({
+                    'filename': entry.name,
+                    'path': entry.path,
+                    'size': stat.st_size,
+                    'size_mb': round(stat.st_size / (1024 * 1024), 2),
+                    'created': datetime.fromtimestamp(stat.st_mtime)
+                })
             
             # Sort by date (newest first)
             backups.sort(key=lambda x: x['created'], reverse=True)
@@ -136,8 +157,17 @@ class BackupManager:
             # Create backup of current state before restore
             self.create_backup(suffix="before_restore")
             
-            # Restore backup
-            shutil.copy2(backup_path, self.db_path)
+            # Restore through the backup API: copying the file over a WAL-mode
+            # database would leave the old -wal file to be replayed on top of it
+            source = sqlite3.connect(backup_path)
+            try:
+                target = sqlite3.connect(self.db_path)
+                try:
+                    source.backup(target)
+                finally:
+                    target.close()
+            finally:
+                source.close()
             
             logger.info(f"Database restored from: {backup_path}")
             return True
@@ -149,7 +179,8 @@ class BackupManager:
     def delete_backup(self, backup_path: str) -> bool:
         """Delete a specific backup file."""
         try:
-            if os.path.exists(backup_path) and backup_path.startswith(self.backup_dir):
+            path = Path(backup_path).resolve()
+            if path.is_file() and path.is_relative_to(Path(self.backup_dir).resolve()):
                 os.remove(backup_path)
                 logger.info(f"Backup deleted: {backup_path}")
                 return True
@@ -174,7 +205,7 @@ async def scheduled_backup_task(interval_hours: int = DEFAULT_BACKUP_INTERVAL_HO
             await asyncio.sleep(interval_hours * 3600)
             
             # Create backup
-            backup_manager.create_backup(suffix="auto")
+            await backup_manager.create_backup_async(suffix="auto")
             
         except asyncio.CancelledError:
             logger.info("Scheduled backup task cancelled")
@@ -0,0 +1,63 @@
+"""
+In-process TTL cache for rarely changing query results.
+"""
+import time
+import functools
+from typing import Any, Dict, Tuple
+
+
+def ttl_cache(ttl: float, maxsize: int = 128):
+    """
+    Cache results of an async CRUD function `func(db, *args, **kwargs)` for `ttl` seconds.
+    
+    The session argument is not part of the cache key.
+    Call `func.invalidate()` after writes that change the cached data.
+    
+    The cache is per process: invalidation is immediate only when the writer runs
+    in the same process (`run.py` with no arguments). With the bot and admin panel
+    started separately, the bot sees admin edits once its entries expire,
+    i.e. after up to `ttl` seconds.
+    """
+    def decorator(func):
+        # {key: (expires_at, value)}
+        entries: Dict[Tuple, Tuple[float, Any]] = {}
+        # Bumped by invalidate(), so results of queries that started before
+        # an invalidation are not stored
+        generation = 0
+        
+        @functools.wraps(func)
+        async def wrapper(db, *args, **kwargs):
+            key = (args, tuple(sorted(kwargs.items())))
+            now = time.monotonic()
+            
+            entry = entries.get(key)
+            if entry is not None and entry[0] > now:
+                return entry[1]
+            
+            started_generation = generation
+            value = await func(db, *args, **kwargs)
+            if generation != started_generation:
+                # A write was committed while the query ran; it may be stale
+                return value
+            
+            now = time.monotonic()
+            
+            if key not in entries and len(entries) >= maxsize:
+                # Drop expired entries, then the oldest one if still full
+                for old_key in [k for k, (expires_at, _) in entries.items() if expires_at <= now]:
+                    del entries[old_key]
+                if len(entries) >= maxsize:
+                    del entries[next(iter(entries))]
+            
+            entries[key] = (now + ttl, value)
+            return value
+        
+        def invalidate():
+            nonlocal generation
+            generation += 1
+            entries.clear()
+        
+        wrapper.invalidate = invalidate
+        return wrapper
+    
+    return decorator
@@ -1,15 +1,67 @@
-from sqlalchemy import select, update, delete, func
-from sqlalchemy.orm import selectinload
+from sqlalchemy import select, update, delete, func, tuple_
+from sqlalchemy.orm import selectinload, joinedload
+from sqlalchemy.dialects import sqlite, postgresql
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import Optional, List
+from typing import Optional, List, Tuple
 from datetime import datetime
 
+from .cache import ttl_cache
+from .search import user_search_condition
 from .models import (
     User, Application, Nomination, Admin, BotContent, Settings,
     ApplicationStatus, AdminRole, Broadcast, BroadcastStatus
 )
 
 
+# Eager-load application's user and stage
+APPLICATION_RELATIONS = (
+    selectinload(Application.user),
+    selectinload(Application.nomination),
+)
+
+# Same relations for a single application: both are many-to-one, so joining
+# them fetches everything in one query without multiplying rows
+APPLICATION_RELATIONS_JOINED = (
+    joinedload(Application.user),
+    joinedload(Application.nomination),
+)
+
+
+async def _update_returning(db: AsyncSession, model, row_id: int, values: dict, *options):
+    """UPDATE a row by id and get it back from the same statement (UPDATE ... RETURNING)."""
+    result = await db.execute(
+        update(model)
+        .where(model.id == row_id)
+        .values(**values)
+        .returning(model)
+        .options(*options),
+        execution_options={"synchronize_session": "fetch", "populate_existing": True}
+    )
+    obj = result.scalar_one_or_none()
+    await db.commit()
+    return obj
+
+
+async def _keyset_after(db: AsyncSession, model, after_id: int):
+    """
+    Keyset condition: rows that follow `after_id` in newest-first (created_at, id) order.
+    Returns None if that row no longer exists (e.g. deleted between pages),
+    so the caller can fall back to offset pagination.
+    """
+    exists = await db.scalar(select(model.id).where(model.id == after_id))
+    if exists is None:
+        return None
+    
+    # Compare against the stored value in SQL: SQLite keeps datetimes as text,
+    # and a Python-bound datetime would not compare equal to it
+    after_created_at = (
+        select(model.created_at)
+        .where(model.id == after_id)
+        .scalar_subquery()
+    )
+    return tuple_(model.created_at, model.id) < tuple_(after_created_at, after_id)
+
+
 # ==================== USER CRUD ====================
 
 async def get_user_by_telegram_id(db: AsyncSession, telegram_id: int) -> Optional[User]:
@@ -27,41 +79,84 @@ async def get_user_by_id(db: AsyncSession, user_id: int) -> Optional[User]:
 
 
 async def create_user(db: AsyncSession, telegram_id: int, username: Optional[str] = None) -> User:
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        # One INSERT ... RETURNING instead of INSERT + refresh; if the same user was
+        # created concurrently, the existing row is returned instead of failing
+        insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+        stmt = insert(User).values(telegram_id=telegram_id, username=username)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[User.telegram_id],
+            set_={"username": stmt.excluded.username}
+        ).returning(User)
+        result = await db.execute(stmt, execution_options={"populate_existing": True})
+        user = result.scalar_one()
+        await db.commit()
+        get_users_count.invalidate()
+        return user
+    
     user = User(telegram_id=telegram_id, username=username)
     db.add(user)
     await db.commit()
     await db.refresh(user)
+    get_users_count.invalidate()
     return user
 
 
 async def update_user(db: AsyncSession, user_id: int, **kwargs) -> Optional[User]:
-    await db.execute(
-        update(User).where(User.id == user_id).values(**kwargs)
-    )
-    await db.commit()
-    return await get_user_by_id(db, user_id)
+    user = await _update_returning(db, User, user_id, kwargs)
+    if "city" in kwargs:
+        get_unique_cities.invalidate()
+    # Participant and application searches match on user fields
+    _invalidate_application_counts()
+    return user
 
 
 async def get_or_create_user(db: AsyncSession, telegram_id: int, username: Optional[str] = None) -> User:
-    """Get existing user or create new one."""
+    """Get existing user or create new one.
+    
+    Existing users (the common case) cost a single SELECT and no write.
+    """
     user = await get_user_by_telegram_id(db, telegram_id)
     if not user:
         user = await create_user(db, telegram_id, username)
     return user
 
 
-async def get_all_users(db: AsyncSession, skip: int = 0, limit: int = 100) -> List[User]:
+async def get_all_users(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    after_id: Optional[int] = None
+) -> List[User]:
+    """Get users, newest first. `after_id` switches to keyset pagination (see get_all_applications)."""
+    query = select(User)
+    after = await _keyset_after(db, User, after_id) if after_id else None
+    if after is not None:
+        query = query.where(after)
+    else:
+        query = query.offset(skip)
     result = await db.execute(
-        select(User).offset(skip).limit(limit).order_by(User.created_at.desc())
+        query.limit(limit).order_by(User.created_at.desc(), User.id.desc())
     )
     return result.scalars().all()
 
 
+# Totals for pagination may lag writes by a few seconds; keyed by the filter values
+COUNT_CACHE_TTL = 10
+
+
+@ttl_cache(COUNT_CACHE_TTL)
 async def get_users_count(db: AsyncSession) -> int:
     result = await db.execute(select(func.count(User.id)))
     return result.scalar()
 
 
+# Lookup lists for admin filters change rarely, cache them briefly
+LOOKUP_CACHE_TTL = 60
+
+
+@ttl_cache(LOOKUP_CACHE_TTL)
 async def get_unique_cities(db: AsyncSession) -> List[str]:
     """Get unique cities from users who have applications."""
     result = await db.execute(
@@ -78,32 +173,51 @@ async def get_unique_cities(db: AsyncSession) -> List[str]:
 async def get_participants_with_stats(
     db: AsyncSession, 
     skip: int = 0, 
-    limit: int = 50,
-    search: Optional[str] = None
+    limit: Optional[int] = 50,
+    search: Optional[str] = None,
+    after_id: Optional[int] = None
 ) -> List[dict]:
-    """Get participants with their application count and last application date in one query."""
-    # Build subquery for application stats
+    """
+    Get participants with their application count and last application date in one query.
+    Pass limit=None to get all participants.
+    If after_id (a user id) is given, returns participants that follow it
+    (keyset pagination, `skip` is ignored); if that user is gone, uses offset.
+    """
+    # Stats are correlated per user, so a page walks the (created_at, id) index
+    # and stops after `limit` participants instead of grouping all applications
+    app_count = (
+        select(func.count(Application.id))
+        .where(Application.user_id == User.id)
+        .scalar_subquery()
+    )
+    last_app_date = (
+        select(func.max(Application.created_at))
+        .where(Application.user_id == User.id)
+        .scalar_subquery()
+    )
     query = (
         select(
             User,
-            func.count(Application.id).label('app_count'),
-            func.max(Application.created_at).label('last_app_date')
+            app_count.label('app_count'),
+            last_app_date.label('last_app_date')
         )
-        .join(Application, User.id == Application.user_id)
-        .group_by(User.id)
-        .order_by(User.created_at.desc())
+        .where(User.applications.any())
+        .order_by(User.created_at.desc(), User.id.desc())
     )
     
     if search:
-        search_filter = f"%{search}%"
         query = query.where(
-            (User.username.ilike(search_filter)) |
-            (User.full_name.ilike(search_filter)) |
-            (User.city.ilike(search_filter)) |
-            (User.school.ilike(search_filter))
+            user_search_condition(search, User.username, User.full_name, User.city, User.school)
         )
     
-    query = query.offset(skip).limit(limit)
+    # Continue after the last seen participant without scanning skipped rows
+    after = await _keyset_after(db, User, after_id) if after_id else None
+    if after is not None:
+        query = query.where(after)
+    else:
+        query = query.offset(skip)
+    
+    query = query.limit(limit)
     result = await db.execute(query)
     
     participants = []
@@ -117,6 +231,7 @@ async def get_participants_with_stats(
     return participants
 
 
+@ttl_cache(COUNT_CACHE_TTL)
 async def get_participants_count(db: AsyncSession, search: Optional[str] = None) -> int:
     """Get count of participants (users with at least one application)."""
     query = (
@@ -124,12 +239,8 @@ async def get_participants_count(db: AsyncSession, search: Optional[str] = None)
     )
     
     if search:
-        search_filter = f"%{search}%"
         query = query.join(User, Application.user_id == User.id).where(
-            (User.username.ilike(search_filter)) |
-            (User.full_name.ilike(search_filter)) |
-            (User.city.ilike(search_filter)) |
-            (User.school.ilike(search_filter))
+            user_search_condition(search, User.username, User.full_name, User.city, User.school)
         )
     
     result = await db.scalar(query)
@@ -145,12 +256,13 @@ async def get_nomination_by_id(db: AsyncSession, nomination_id: int) -> Optional
     return result.scalar_one_or_none()
 
 
+@ttl_cache(LOOKUP_CACHE_TTL)
 async def get_active_nominations(db: AsyncSession) -> List[Nomination]:
-    """Get active nominations that are within their time period."""
+    """Get active nominations in display order, regardless of their time period."""
     result = await db.execute(
         select(Nomination)
         .where(Nomination.is_active == True)
-        .order_by(Nomination.id)
+        .order_by(Nomination.order, Nomination.id)
     )
     return result.scalars().all()
 
@@ -158,12 +270,8 @@ async def get_active_nominations(db: AsyncSession) -> List[Nomination]:
 async def get_available_nominations(db: AsyncSession) -> List[Nomination]:
     """Get nominations available for submission (active + within time period)."""
     now = datetime.now()
-    result = await db.execute(
-        select(Nomination)
-        .where(Nomination.is_active == True)
-        .order_by(Nomination.id)
-    )
-    nominations = result.scalars().all()
+    # Active stages are cached; the time period is checked on every call
+    nominations = await get_active_nominations(db)
     
     # Filter by time period
     available = []
@@ -179,6 +287,7 @@ async def get_available_nominations(db: AsyncSession) -> List[Nomination]:
     return available
 
 
+@ttl_cache(LOOKUP_CACHE_TTL)
 async def get_all_nominations(db: AsyncSession) -> List[Nomination]:
     result = await db.execute(
         select(Nomination).order_by(Nomination.id)
@@ -202,15 +311,32 @@ async def create_nomination(
     db.add(nomination)
     await db.commit()
     await db.refresh(nomination)
+    get_all_nominations.invalidate()
+    get_active_nominations.invalidate()
     return nomination
 
 
 async def update_nomination(db: AsyncSession, nomination_id: int, **kwargs) -> Optional[Nomination]:
-    await db.execute(
-        update(Nomination).where(Nomination.id == nomination_id).values(**kwargs)
+    """Update stage fields. No UPDATE is issued if nothing has changed."""
+    result = await db.execute(
+        select(Nomination)
+        .where(Nomination.id == nomination_id)
     )
-    await db.commit()
-    return await get_nomination_by_id(db, nomination_id)
+    nomination = result.scalar_one_or_none()
+    if not nomination:
+        return None
+    
+    # Only assign changed values, so an unchanged form leaves the object clean
+    for key, value in kwargs.items():
+        if getattr(nomination, key) != value:
+            setattr(nomination, key, value)
+    
+    if db.is_modified(nomination):
+        await db.commit()
+        get_all_nominations.invalidate()
+        get_active_nominations.invalidate()
+    
+    return nomination
 
 
 async def delete_nomination(db: AsyncSession, nomination_id: int) -> bool:
@@ -218,6 +344,8 @@ async def delete_nomination(db: AsyncSession, nomination_id: int) -> bool:
         delete(Nomination).where(Nomination.id == nomination_id)
     )
     await db.commit()
+    get_all_nominations.invalidate()
+    get_active_nominations.invalidate()
     return True
 
 
@@ -226,16 +354,17 @@ async def delete_nomination(db: AsyncSession, nomination_id: int) -> bool:
 async def get_application_by_id(db: AsyncSession, application_id: int) -> Optional[Application]:
     result = await db.execute(
         select(Application)
-        .options(selectinload(Application.user), selectinload(Application.nomination))
+        .options(*APPLICATION_RELATIONS_JOINED)
         .where(Application.id == application_id)
     )
     return result.scalar_one_or_none()
 
 
 async def get_user_applications(db: AsyncSession, user_id: int) -> List[Application]:
+    # The caller already has the user: load only the stages, in one IN-query
     result = await db.execute(
         select(Application)
-        .options(selectinload(Application.user), selectinload(Application.nomination))
+        .options(selectinload(Application.nomination))
         .where(Application.user_id == user_id)
         .order_by(Application.created_at.desc())
     )
@@ -250,30 +379,31 @@ async def get_all_applications(
     search: Optional[str] = None,
     city: Optional[str] = None,
     date_from: Optional[datetime] = None,
-    date_to: Optional[datetime] = None
+    date_to: Optional[datetime] = None,
+    after_id: Optional[int] = None
 ) -> List[Application]:
-    query = select(Application).options(
-        selectinload(Application.user), 
-        selectinload(Application.nomination)
-    )
+    """
+    Get applications with filters, newest first.
+    If after_id is given, returns applications that follow it (keyset
+    pagination, `skip` is ignored); otherwise, or if that application is
+    gone, uses offset pagination.
+    """
+    query = select(Application).options(*APPLICATION_RELATIONS)
     
     if nomination_id:
         query = query.where(Application.nomination_id == nomination_id)
     
     # Search filter (by user's full_name, username, school)
     if search:
-        search_filter = f"%{search}%"
         query = query.join(Application.user).where(
-            (User.full_name.ilike(search_filter)) |
-            (User.username.ilike(search_filter)) |
-            (User.school.ilike(search_filter))
+            user_search_condition(search, User.full_name, User.username, User.school)
         )
     
     # City filter
     if city:
         if not search:  # If search didn't join user already
             query = query.join(Application.user)
-        query = query.where(User.city.ilike(f"%{city}%"))
+        query = query.where(user_search_condition(city, User.city))
     
     # Date range filter
     if date_from:
@@ -281,11 +411,24 @@ async def get_all_applications(
     if date_to:
         query = query.where(Application.created_at <= date_to)
     
-    query = query.offset(skip).limit(limit).order_by(Application.created_at.desc())
+    # Continue after the last seen application without scanning skipped rows
+    after = await _keyset_after(db, Application, after_id) if after_id else None
+    if after is not None:
+        query = query.where(after)
+    else:
+        query = query.offset(skip)
+    
+    query = query.limit(limit).order_by(Application.created_at.desc(), Application.id.desc())
     result = await db.execute(query)
     return result.scalars().all()
 
 
+def _invalidate_application_counts():
+    get_applications_count.invalidate()
+    get_participants_count.invalidate()
+
+
+@ttl_cache(COUNT_CACHE_TTL)
 async def get_applications_count(
     db: AsyncSession,
     nomination_id: Optional[int] = None,
@@ -301,17 +444,14 @@ async def get_applications_count(
         query = query.where(Application.nomination_id == nomination_id)
     
     if search:
-        search_filter = f"%{search}%"
         query = query.join(Application.user).where(
-            (User.full_name.ilike(search_filter)) |
-            (User.username.ilike(search_filter)) |
-            (User.school.ilike(search_filter))
+            user_search_condition(search, User.full_name, User.username, User.school)
         )
     
     if city:
         if not search:
             query = query.join(Application.user)
-        query = query.where(User.city.ilike(f"%{city}%"))
+        query = query.where(user_search_condition(city, User.city))
     
     if date_from:
         query = query.where(Application.created_at >= date_from)
@@ -344,28 +484,28 @@ async def create_application(
     db.add(application)
     await db.commit()
     await db.refresh(application)
+    get_unique_cities.invalidate()
+    _invalidate_application_counts()
     return application
 
 
 async def update_application(db: AsyncSession, application_id: int, **kwargs) -> Optional[Application]:
-    await db.execute(
-        update(Application).where(Application.id == application_id).values(**kwargs)
-    )
-    await db.commit()
-    return await get_application_by_id(db, application_id)
+    return await _update_returning(db, Application, application_id, kwargs, *APPLICATION_RELATIONS)
 
 
 async def delete_application(db: AsyncSession, application_id: int) -> bool:
     """Delete an application by ID."""
     result = await db.execute(
-        select(Application).where(Application.id == application_id)
+        delete(Application)
+        .where(Application.id == application_id)
+        .returning(Application.id)
     )
-    application = result.scalar_one_or_none()
-    if application:
-        await db.delete(application)
-        await db.commit()
-        return True
-    return False
+    deleted = result.scalar_one_or_none() is not None
+    await db.commit()
+    if deleted:
+        get_unique_cities.invalidate()
+        _invalidate_application_counts()
+    return deleted
 
 
 async def get_applications_count_by_nomination(db: AsyncSession) -> List[tuple]:
@@ -385,6 +525,8 @@ async def get_applications_count_by_nomination(db: AsyncSession) -> List[tuple]:
 
 # ==================== BOT CONTENT CRUD ====================
 
+# Bot texts and settings are read on every bot update, cache them briefly
+@ttl_cache(LOOKUP_CACHE_TTL)
 async def get_bot_content(db: AsyncSession, key: str) -> Optional[str]:
     result = await db.execute(
         select(BotContent.value).where(BotContent.key == key)
@@ -393,25 +535,59 @@ async def get_bot_content(db: AsyncSession, key: str) -> Optional[str]:
     return value
 
 
-async def set_bot_content(db: AsyncSession, key: str, value: str, description: Optional[str] = None) -> BotContent:
-    existing = await db.execute(
-        select(BotContent).where(BotContent.key == key)
+async def _upsert_by_key(db: AsyncSession, model, **values):
+    """
+    Insert or update a `key`-unique row in one INSERT ... ON CONFLICT ... RETURNING.
+    An empty description keeps the stored one. Returns None (nothing executed)
+    on dialects without upsert support.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect not in ("sqlite", "postgresql"):
+        return None
+    
+    insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+    set_ = {name: value for name, value in values.items() if name != "key"}
+    if not set_.get("description"):
+        set_.pop("description", None)
+    set_["updated_at"] = func.now()
+    
+    stmt = (
+        insert(model)
+        .values(**values)
+        .on_conflict_do_update(index_elements=[model.key], set_=set_)
+        .returning(model)
     )
-    content = existing.scalar_one_or_none()
+    result = await db.execute(stmt, execution_options={"populate_existing": True})
+    return result.scalar_one()
+
+
+async def set_bot_content(db: AsyncSession, key: str, value: str, description: Optional[str] = None) -> BotContent:
+    content = await _upsert_by_key(db, BotContent, key=key, value=value, description=description)
     
-    if content:
-        content.value = value
-        if description:
-            content.description = description
-    else:
-        content = BotContent(key=key, value=value, description=description)
-        db.add(content)
+    if content is None:
+        existing = await db.execute(
+            select(BotContent).where(BotContent.key == key)
+        )
+        content = existing.scalar_one_or_none()
+        
+        if content:
+            content.value = value
+            if description:
+                content.description = description
+        else:
+            content = BotContent(key=key, value=value, description=description)
+            db.add(content)
+        
+        await db.flush()
+        await db.refresh(content)
     
     await db.commit()
-    await db.refresh(content)
+    get_bot_content.invalidate()
+    get_all_bot_content.invalidate()
     return content
 
 
+@ttl_cache(LOOKUP_CACHE_TTL)
 async def get_all_bot_content(db: AsyncSession) -> List[BotContent]:
     result = await db.execute(select(BotContent).order_by(BotContent.key))
     return result.scalars().all()
@@ -423,11 +599,14 @@ async def delete_bot_content(db: AsyncSession, key: str) -> bool:
         delete(BotContent).where(BotContent.key == key)
     )
     await db.commit()
+    get_bot_content.invalidate()
+    get_all_bot_content.invalidate()
     return True
 
 
 # ==================== SETTINGS CRUD ====================
 
+@ttl_cache(LOOKUP_CACHE_TTL)
 async def get_setting(db: AsyncSession, key: str, default: str = "") -> str:
     result = await db.execute(
         select(Settings.value).where(Settings.key == key)
@@ -443,25 +622,89 @@ async def set_setting(
     value_type: str = "string",
     description: Optional[str] = None
 ) -> Settings:
-    existing = await db.execute(
-        select(Settings).where(Settings.key == key)
+    setting = await _upsert_by_key(
+        db, Settings, key=key, value=value, value_type=value_type, description=description
     )
-    setting = existing.scalar_one_or_none()
     
-    if setting:
-        setting.value = value
-        setting.value_type = value_type
-        if description:
-            setting.description = description
-    else:
-        setting = Settings(key=key, value=value, value_type=value_type, description=description)
-        db.add(setting)
+    if setting is None:
+        existing = await db.execute(
+            select(Settings).where(Settings.key == key)
+        )
+        setting = existing.scalar_one_or_none()
+        
+        if setting:
+            setting.value = value
+            setting.value_type = value_type
+            if description:
+                setting.description = description
+        else:
+            setting = Settings(key=key, value=value, value_type=value_type, description=description)
+            db.add(setting)
+        
+        await db.flush()
+        await db.refresh(setting)
     
     await db.commit()
-    await db.refresh(setting)
+    get_setting.invalidate()
+    get_all_settings.invalidate()
     return setting
 
 
+async def set_settings_bulk(
+    db: AsyncSession,
+    items: List[Tuple[str, str, str, Optional[str]]]
+) -> None:
+    """
+    Insert or update several settings in one statement and one commit.
+    
+    Args:
+        items: (key, value, value_type, description) tuples
+    """
+    if not items:
+        return
+    
+    rows = [
+        {"key": key, "value": value, "value_type": value_type, "description": description}
+        for key, value, value_type, description in items
+    ]
+    
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+        stmt = insert(Settings).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Settings.key],
+            set_={
+                "value": stmt.excluded.value,
+                "value_type": stmt.excluded.value_type,
+                # Keep old description if none is given, like set_setting
+                "description": func.coalesce(stmt.excluded.description, Settings.description),
+                "updated_at": func.now()
+            }
+        )
+        await db.execute(stmt)
+    else:
+        # No portable upsert: update loaded rows, add missing ones
+        result = await db.execute(
+            select(Settings).where(Settings.key.in_([row["key"] for row in rows]))
+        )
+        existing = {setting.key: setting for setting in result.scalars()}
+        for row in rows:
+            setting = existing.get(row["key"])
+            if setting:
+                setting.value = row["value"]
+                setting.value_type = row["value_type"]
+                if row["description"]:
+                    setting.description = row["description"]
+            else:
+                db.add(Settings(**row))
+    
+    await db.commit()
+    get_setting.invalidate()
+    get_all_settings.invalidate()
+
+
+@ttl_cache(LOOKUP_CACHE_TTL)
 async def get_all_settings(db: AsyncSession) -> List[Settings]:
     result = await db.execute(select(Settings).order_by(Settings.key))
     return result.scalars().all()
@@ -529,11 +772,15 @@ async def get_all_broadcasts(db: AsyncSession, limit: int = 50) -> List[Broadcas
 
 
 async def update_broadcast(db: AsyncSession, broadcast_id: int, **kwargs) -> Optional[Broadcast]:
+    return await _update_returning(db, Broadcast, broadcast_id, kwargs)
+
+
+async def update_broadcast_progress(db: AsyncSession, broadcast_id: int, **kwargs) -> None:
+    """Update broadcast counters/status without reloading the row."""
     await db.execute(
         update(Broadcast).where(Broadcast.id == broadcast_id).values(**kwargs)
     )
     await db.commit()
-    return await get_broadcast_by_id(db, broadcast_id)
 
 
 async def delete_broadcast(db: AsyncSession, broadcast_id: int) -> bool:
@@ -544,9 +791,24 @@ async def delete_broadcast(db: AsyncSession, broadcast_id: int) -> bool:
     return True
 
 
-async def get_all_user_telegram_ids(db: AsyncSession) -> List[int]:
-    """Get all user telegram IDs for broadcast."""
+async def get_broadcast_recipients_count(db: AsyncSession) -> int:
+    """Count users that receive broadcasts."""
+    result = await db.scalar(
+        select(func.count(User.id)).where(User.is_blocked == False)
+    )
+    return result or 0
+
+
+async def get_user_telegram_ids_after(db: AsyncSession, last_id: int, limit: int = 500) -> List[Tuple[int, int]]:
+    """
+    Get (user id, telegram id) of non-blocked users with ID above `last_id`, by ID.
+    Keyset page for broadcasts: pass the last returned user ID to get the next page.
+    """
     result = await db.execute(
-        select(User.telegram_id).where(User.is_blocked == False)
+        select(User.id, User.telegram_id)
+        .where(User.is_blocked == False)
+        .where(User.id > last_id)
+        .order_by(User.id)
+        .limit(limit)
     )
-    return [row[0] for row in result.fetchall()]
+    return result.all()
@@ -1,27 +1,65 @@
+import asyncio
+from sqlalchemy import event, text
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import AsyncAdaptedQueuePool, StaticPool
 from config import settings
 
 Base = declarative_base()
 
-# SQLite with aiosqlite uses StaticPool by default
-# For other databases (PostgreSQL, MySQL), you might want connection pooling
+# Connection pool for server databases; sized for the bot and admin panel
+# sharing one process, failing fast instead of queueing when exhausted
+POOL_SIZE = 20
+POOL_MAX_OVERFLOW = 30
+POOL_TIMEOUT = 5
+
+# SQLite tuning applied to every new connection: WAL lets readers run during a
+# write, synchronous=NORMAL is durable in WAL mode and fsyncs only at checkpoints
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",   # 256 MB
+    "PRAGMA cache_size=-65536",     # 64 MB
+)
+
+# SQLite file databases get a small pool: in WAL mode reads run concurrently
+# with a write, and writers wait for each other on SQLite's own lock
+SQLITE_POOL_SIZE = 5
+SQLITE_MAX_OVERFLOW = 10
+
 if "sqlite" in settings.database_url:
+    if ":memory:" in settings.database_url:
+        # Every connection to :memory: is a separate database, keep exactly one
+        pool_options = {"poolclass": StaticPool}
+    else:
+        pool_options = {
+            "poolclass": AsyncAdaptedQueuePool,
+            "pool_size": SQLITE_POOL_SIZE,
+            "max_overflow": SQLITE_MAX_OVERFLOW
+        }
+    
     async_engine = create_async_engine(
         settings.database_url,
         echo=settings.debug,
         connect_args={"check_same_thread": False},
-        poolclass=StaticPool
+        **pool_options
     )
+    
+    @event.listens_for(async_engine.sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in SQLITE_PRAGMAS:
+            cursor.execute(pragma)
+        cursor.close()
 else:
     # For production databases, use connection pooling
     async_engine = create_async_engine(
         settings.database_url,
         echo=settings.debug,
-        pool_size=5,
-        max_overflow=10,
-        pool_timeout=30,
+        pool_size=POOL_SIZE,
+        max_overflow=POOL_MAX_OVERFLOW,
+        pool_timeout=POOL_TIMEOUT,
         pool_pre_ping=True
     )
 
@@ -37,8 +75,38 @@ async def get_db() -> AsyncSession:
         yield session
 
 
+async def run_in_session(func, *args, **kwargs):
+    """Run a CRUD function in its own session, so several can be awaited concurrently."""
+    async with async_session() as session:
+        return await func(session, *args, **kwargs)
+
+
 async def init_db():
     """Initialize database and create all tables."""
     from .models import Base
+    from .search import create_user_search_index
     async with async_engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        # create_all skips indexes of tables that already exist
+        await conn.run_sync(_create_missing_indexes, Base.metadata)
+        await conn.run_sync(create_user_search_index)
+    await warm_up_pool()
+
+
+def _create_missing_indexes(conn, metadata):
+    for table in metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+
+async def warm_up_pool():
+    """Open the pooled connections up front so first requests don't pay for connecting."""
+    if "sqlite" in settings.database_url:
+        # Local connections are cheap to open on demand
+        return
+    
+    async def ping():
+        async with async_engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+    
+    await asyncio.gather(*(ping() for _ in range(POOL_SIZE)))
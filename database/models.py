@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, BigInteger, String, Text, Boolean, DateTime, ForeignKey, Enum as SQLEnum
+from sqlalchemy import Column, Integer, BigInteger, String, Text, Boolean, DateTime, ForeignKey, Index, Enum as SQLEnum
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from datetime import datetime
@@ -22,6 +22,10 @@ class AdminRole(enum.Enum):
 class User(Base):
     """Участник конкурса."""
     __tablename__ = "users"
+    __table_args__ = (
+        # Newest-first listing and keyset pagination: ORDER BY created_at DESC, id DESC
+        Index("ix_users_created_at_id", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     telegram_id = Column(BigInteger, unique=True, nullable=False, index=True)
@@ -36,7 +40,8 @@ class User(Base):
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
     
     # Relationships
-    applications = relationship("Application", back_populates="user", lazy="selectin")
+    # Never loaded implicitly: call sites that need them eager-load explicitly
+    applications = relationship("Application", back_populates="user", lazy="raise")
 
 
 class Nomination(Base):
@@ -55,15 +60,21 @@ class Nomination(Base):
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
     
     # Relationships
-    applications = relationship("Application", back_populates="nomination", lazy="selectin")
+    applications = relationship("Application", back_populates="nomination", lazy="raise")
 
 
 class Application(Base):
     """Заявка на конкурс."""
     __tablename__ = "applications"
+    __table_args__ = (
+        # Newest-first listing and keyset pagination: ORDER BY created_at DESC, id DESC
+        Index("ix_applications_created_at_id", "created_at", "id"),
+        # Same listing filtered by stage
+        Index("ix_applications_nomination_created_at_id", "nomination_id", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     nomination_id = Column(Integer, ForeignKey("nominations.id"), nullable=False)
     
     # Фотографии (до 5 штук, храним пути через запятую или JSON)
@@ -0,0 +1,86 @@
+"""
+Substring search over user text fields.
+On SQLite an FTS5 trigram index on users is used; elsewhere plain ILIKE.
+"""
+import logging
+
+from sqlalchemy import or_, select, literal_column, table, column
+from sqlalchemy.exc import OperationalError
+
+from .models import User
+
+logger = logging.getLogger(__name__)
+
+# Searchable user columns, in the FTS table's column order
+SEARCH_COLUMNS = ("username", "full_name", "city", "school")
+
+# The trigram tokenizer indexes 3-character sequences; shorter queries can't use it
+MIN_FTS_QUERY_LENGTH = 3
+
+# External-content FTS5 table over users, kept in sync by triggers
+_FTS_DDL = (
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5(
+        {", ".join(SEARCH_COLUMNS)}, content='users', content_rowid='id', tokenize='trigram'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS users_fts_ai AFTER INSERT ON users BEGIN
+        INSERT INTO users_fts(rowid, {", ".join(SEARCH_COLUMNS)})
+        VALUES (new.id, {", ".join("new." + name for name in SEARCH_COLUMNS)});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS users_fts_ad AFTER DELETE ON users BEGIN
+        INSERT INTO users_fts(users_fts, rowid, {", ".join(SEARCH_COLUMNS)})
+        VALUES ('delete', old.id, {", ".join("old." + name for name in SEARCH_COLUMNS)});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS users_fts_au AFTER UPDATE ON users BEGIN
+        INSERT INTO users_fts(users_fts, rowid, {", ".join(SEARCH_COLUMNS)})
+        VALUES ('delete', old.id, {", ".join("old." + name for name in SEARCH_COLUMNS)});
+        INSERT INTO users_fts(rowid, {", ".join(SEARCH_COLUMNS)})
+        VALUES (new.id, {", ".join("new." + name for name in SEARCH_COLUMNS)});
+    END""",
+)
+
+_users_fts = table("users_fts", column("rowid"))
+
+# Set by create_user_search_index once the index exists
+fts_enabled = False
+
+
+def create_user_search_index(conn):
+    """
+    Create the FTS index and its triggers if missing (SQLite only, sync connection).
+    Falls back to ILIKE search if this SQLite build has no FTS5.
+    """
+    global fts_enabled
+    
+    if conn.dialect.name != "sqlite":
+        return
+    
+    exists = conn.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'users_fts'"
+    ).first()
+    
+    try:
+        for statement in _FTS_DDL:
+            conn.exec_driver_sql(statement)
+        if not exists:
+            # Index users created before the table existed
+            conn.exec_driver_sql("INSERT INTO users_fts(users_fts) VALUES ('rebuild')")
+    except OperationalError as e:
+        logger.warning(f"FTS5 is not available, user search falls back to LIKE: {e}")
+        return
+    
+    fts_enabled = True
+
+
+def user_search_condition(search: str, *columns):
+    """Condition for users whose `columns` contain `search`, case-insensitively."""
+    if fts_enabled and len(search) >= MIN_FTS_QUERY_LENGTH:
+        # One phrase restricted to the given columns: {a b} : "text"
+        names = " ".join(col.key for col in columns)
+        phrase = '"' + search.replace('"', '""') + '"'
+        return User.id.in_(
+            select(_users_fts.c.rowid)
+            .where(literal_column("users_fts").op("MATCH")(f"{{{names}}} : {phrase}"))
+        )
+    
+    search_filter = f"%{search}%"
+    return or_(*(col.ilike(search_filter) for col in columns))
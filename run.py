@@ -5,8 +5,10 @@ Run this file to start both the bot and admin panel.
 import asyncio
 import sys
 import os
+import queue
+import atexit
 import logging
-from logging.handlers import RotatingFileHandler
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 
 # Add project root to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -40,11 +42,22 @@ def setup_logging():
     console_handler.setLevel(logging.INFO)
     console_handler.setFormatter(formatter)
     
+    # Handlers write from a background thread, so disk I/O and log rotation
+    # never block the event loop
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    
+    # Thread/process info is not in the format, don't collect it per record
+    logging.logThreads = False
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+    
     # Configure root logger
     root_logger = logging.getLogger()
     root_logger.setLevel(logging.INFO)
-    root_logger.addHandler(file_handler)
-    root_logger.addHandler(console_handler)
+    root_logger.addHandler(QueueHandler(log_queue))
     
     # Reduce noise from libraries
     logging.getLogger('httpx').setLevel(logging.WARNING)
@@ -55,6 +68,15 @@ def setup_logging():
     return logging.getLogger('bot')
 
 
+def install_uvloop():
+    """Use uvloop's event loop when available (installed with uvicorn[standard])."""
+    try:
+        import uvloop
+    except ImportError:
+        return
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+
+
 async def main():
     """Main entry point."""
     # Setup logging first
@@ -88,10 +110,10 @@ async def main():
     logger.info("  - Admin Panel: http://localhost:8000")
     
     try:
-        await asyncio.gather(
-            dp.start_polling(bot),
-            server.serve()
-        )
+        # If one service fails, the other is cancelled instead of left running
+        async with asyncio.TaskGroup() as tg:
+            tg.create_task(dp.start_polling(bot))
+            tg.create_task(server.serve())
     finally:
         # Cleanup on shutdown
         logger.info("Shutting down...")
@@ -121,6 +143,8 @@ def run_admin_only():
 
 
 if __name__ == "__main__":
+    install_uvloop()
+    
     if len(sys.argv) > 1:
         if sys.argv[1] == "bot":
             run_bot_only()